@@ -0,0 +1,133 @@
+#!/usr/local/bin/python3
+# batch2021.py : Solve many 2021 boards in parallel
+#
+# Code by: Harsh K Atha (hatha), Aashay Gondalia (aagond)
+#
+# Usage: ./batch2021.py boards [--workers N] [--method astar] [--time-limit S] [--max-nodes N] [--stats] [--no-cache]
+#
+# boards is either a text file with one board per line (25 numbers) or a directory of
+# board files in the format solver2021.py reads. One JSON object is printed per board as
+# soon as it finishes, so results stream in completion order rather than input order.
+# Boards already in the solved-board cache are answered from it and the ones solved are
+# added to it, unless --no-cache is given.
+
+import sys
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import solver2021
+
+
+def parse_board(text):
+    '''The board written in text, or None when it is not a permutation of the goal'''
+    try:
+        board = tuple(int(i) for i in text.split())
+    except ValueError:
+        return None
+    return board if sorted(board) == list(solver2021.GOAL_STATE) else None
+
+
+def read_boards(path):
+    '''
+    Read boards from a file with one board per line, or from a directory holding one
+    board file per board. Hidden files, such as .DS_Store, and subdirectories are skipped.
+    A board that cannot be parsed is read as None, so the rest of the batch still runs.
+
+    ARGS    : path[STRING]
+    RETURNS : boards[LIST] of (name[STRING], board[TUPLE] or None)
+    '''
+    if os.path.isdir(path):
+        boards = []
+        for name in sorted(os.listdir(path)):
+            if name.startswith('.') or not os.path.isfile(os.path.join(path, name)):
+                continue
+            with open(os.path.join(path, name), 'r') as file:
+                boards.append((name, parse_board(file.read())))
+    else:
+        with open(path, 'r') as file:
+            boards = [(str(line_number), parse_board(line))
+                      for line_number, line in enumerate(file, 1) if line.strip()]
+    return boards
+
+
+def solve_one(name, board, method, max_nodes, time_limit, stats=False, cache=False):
+    '''
+    Worker entry point. The move tables and pattern databases were built when the parent
+    imported solver2021, and forked workers share those pages copy-on-write. With stats the
+    result also holds the search's SearchStats counters and timings. With cache a board already
+    in the solved-board cache is answered from it instead of searched.
+
+    ARGS    : name[STRING], board[TUPLE], method[STRING], max_nodes[INT], time_limit[FLOAT], stats[BOOL], cache[BOOL]
+    RETURNS : result[DICT]
+    '''
+    start = time.monotonic()
+    budget = solver2021.SearchBudget(max_nodes, time_limit)
+    options = {"budget": budget, "cache": cache}
+    if stats:
+        options["stats"] = solver2021.SearchStats()
+    try:
+        moves = solver2021.solve(board, method, **options)
+        status = "solved"
+    except solver2021.SearchLimitReached as limit:
+        moves = None
+        status = str(limit)
+    except Exception as error:
+        # One bad board gets an error line, the rest of the batch goes on
+        moves = None
+        status = solver2021.error_status(error)
+    result = {"board": name,
+              "status": status,
+              "moves": moves,
+              "length": None if moves is None else len(moves),
+              "nodes_expanded": budget.nodes_expanded,
+              "wall_time": time.monotonic() - start}
+    if stats:
+        result["stats"] = options["stats"].as_dict()
+    return result
+
+
+def solve_batch(boards, workers=None, method="astar", max_nodes=None, time_limit=None, stats=False, cache=False):
+    '''
+    Solve boards across a process pool, yielding each result as it finishes. A board read
+    as None gets an error line straight away.
+
+    ARGS    : boards[LIST] of (name, board), workers[INT], method[STRING], max_nodes[INT], time_limit[FLOAT], stats[BOOL], cache[BOOL]
+    RETURNS : generator of result[DICT]
+    '''
+    context = solver2021.fork_context()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {}
+        for name, board in boards:
+            if board is None:
+                yield {"board": name, "status": "error: couldn't parse board", "moves": None, "length": None}
+            else:
+                futures[executor.submit(solve_one, name, board, method, max_nodes, time_limit, stats, cache)] = name
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as error:
+                # The worker itself died, e.g. killed for running out of memory
+                status = solver2021.error_status(error)
+                yield {"board": futures[future], "status": status, "moves": None, "length": None}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve many 2021 boards in parallel, printing JSON lines")
+    parser.add_argument("boards", help="file with one board per line, or a directory of board files")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--method", default="astar", choices=sorted(set(solver2021.SEARCH_METHODS) - {"anytime"}),
+                        help="search method (anytime yields a series of routes, see solver2021.anytime_search)")
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds allowed per board")
+    parser.add_argument("--max-nodes", type=int, default=None, help="expanded boards allowed per board")
+    parser.add_argument("--stats", action="store_true", help="add search counters and timings to each line (astar only)")
+    parser.add_argument("--no-cache", action="store_true", help="search every board instead of answering boards already in the solved-board cache")
+    args = parser.parse_args()
+    if args.stats and args.method != "astar":
+        parser.error("--stats is only supported with --method astar")
+
+    for result in solve_batch(read_boards(args.boards), args.workers, args.method, args.max_nodes, args.time_limit,
+                              args.stats, not args.no_cache):
+        print(json.dumps(result))
+        sys.stdout.flush()
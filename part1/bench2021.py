@@ -0,0 +1,229 @@
+#!/usr/local/bin/python3
+# bench2021.py : Scrambled boards and a regression benchmark for the 2021 solver
+#
+# Code by: Harsh K Atha (hatha), Aashay Gondalia (aagond)
+#
+# Usage: ./bench2021.py [--depths 1-14] [--boards N] [--seed S] [--method astar] [--size 5x5]
+#                       [--rings N] [--time-limit S] [--max-nodes N] [--write FILE] [--baseline FILE]
+#
+# Boards are scrambled from the goal with a seeded random walk of a given number of moves,
+# so the same seed always gives the same boards. Each board is solved in a fresh process so
+# its peak RSS can be read on its own. --write saves the results as a JSON baseline, and
+# --baseline compares this run against one, exiting with 1 if anything got worse. A baseline
+# written for another seed, method, board shape or number of rings is refused.
+
+import sys
+import json
+import time
+import random
+import resource
+import argparse
+import solver2021
+
+# Scrambles up to this depth are also solved with the bidirectional search, whose
+# routes are optimal, to check the solver's route length
+VERIFY_DEPTH = 6
+# Slowest nodes per second a board may reach, as a fraction of the baseline's, before it counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+
+def scramble(depth, rng):
+    '''
+    Random walk of depth moves from the goal. Moves that the shortest-path move filter
+    would prune, such as a move followed by its inverse, are never picked, and the walk
+    does not revisit a board, so the board is usually depth moves from the goal and never more.
+
+    ARGS    : depth[INT], rng[random.Random]
+    RETURNS : board[TUPLE], moves[LIST] of move names
+    '''
+    move_filter = solver2021.SHORTEST_PATH_MOVE_FILTER
+    board, filter_state, moves = solver2021.GOAL_STATE, 0, []
+    visited = {board}
+    while len(moves) < depth:
+        choices = [move for move in move_filter.allowed[filter_state]
+                   if solver2021.MOVE_GETTERS[move](board) not in visited]
+        move = rng.choice(choices)
+        board = solver2021.MOVE_GETTERS[move](board)
+        visited.add(board)
+        filter_state = move_filter.next_state[filter_state][move]
+        moves.append(solver2021.MOVE_NAMES[move])
+    return board, moves
+
+
+def scrambled_boards(depths, boards_per_depth, seed):
+    '''
+    The benchmark boards: boards_per_depth scrambles for every depth. Each depth has its
+    own generator seeded from seed and the depth, so a board does not change when other
+    depths are added or left out.
+
+    ARGS    : depths[LIST] of INT, boards_per_depth[INT], seed[INT]
+    RETURNS : boards[LIST] of (name[STRING], depth[INT], board[TUPLE])
+    '''
+    boards = []
+    for depth in depths:
+        rng = random.Random("%d-%d" % (seed, depth))
+        boards += [("d%d-%d" % (depth, index), depth, scramble(depth, rng)[0]) for index in range(boards_per_depth)]
+    return boards
+
+
+def benchmark_one(name, depth, board, method, max_nodes, time_limit):
+    '''
+    Solve one board and measure it. Runs in its own worker process.
+
+    ARGS    : name[STRING], depth[INT], board[TUPLE], method[STRING], max_nodes[INT], time_limit[FLOAT]
+    RETURNS : result[DICT]
+    '''
+    budget = solver2021.SearchBudget(max_nodes, time_limit)
+    start = time.monotonic()
+    try:
+        #Measure the search itself, not the solved-board cache
+        moves = solver2021.solve(board, method, cache=False, budget=budget)
+        status = "solved"
+    except solver2021.SearchLimitReached as limit:
+        moves = None
+        status = str(limit)
+    wall_time = time.monotonic() - start
+
+    optimal_length = None
+    if moves is not None and depth <= VERIFY_DEPTH:
+        optimal_length = len(solver2021.bidirectional_search(board))
+    return {"board": name,
+            "depth": depth,
+            "status": status,
+            "length": None if moves is None else len(moves),
+            "optimal_length": optimal_length,
+            "optimal": None if optimal_length is None else len(moves) == optimal_length,
+            "nodes_expanded": budget.nodes_expanded,
+            "wall_time": wall_time,
+            "nodes_per_second": budget.nodes_expanded / wall_time if wall_time else None,
+            # Linux reports kilobytes
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def _benchmark_in_child(connection, args):
+    connection.send(benchmark_one(*args))
+    connection.close()
+
+
+def run_benchmark(boards, method="astar", max_nodes=None, time_limit=None):
+    '''
+    Benchmark every board, each in a fresh forked process so peak RSS is per board. These are
+    plain processes rather than a pool's daemonic workers, so hda can start its own workers.
+
+    ARGS    : boards[LIST] of (name, depth, board), method[STRING], max_nodes[INT], time_limit[FLOAT]
+    RETURNS : generator of result[DICT]
+    '''
+    context = solver2021.fork_context()
+    for name, depth, board in boards:
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_benchmark_in_child,
+                                  args=(sender, (name, depth, board, method, max_nodes, time_limit)))
+        process.start()
+        sender.close()
+        try:
+            result = receiver.recv()
+        except EOFError:
+            result = None
+        process.join()
+        if result is None:
+            raise(Exception("Error: benchmark process for board %s exited with code %s" % (name, process.exitcode)))
+        yield result
+
+
+def baseline_mismatches(baseline, settings):
+    '''
+    The settings a baseline was written with that differ from this run's. Boards are matched
+    by name alone, so a baseline from another seed, method or board shape compares different boards.
+
+    ARGS    : baseline[DICT] as written by --write, settings[DICT] of seed, method, size and rings
+    RETURNS : mismatches[LIST] of STRING
+    '''
+    return ["%s is %s, baseline has %s" % (key, value, baseline.get(key))
+            for key, value in settings.items() if baseline.get(key) != value]
+
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    '''
+    Regressions of this run against a baseline: boards no longer solved, longer or no longer
+    optimal routes, more nodes expanded, or nodes per second down by more than tolerance.
+    HDA* expands a different number of boards from run to run, so its counts are not compared.
+
+    ARGS    : results[LIST] of DICT, baseline[DICT] as written by --write, tolerance[FLOAT]
+    RETURNS : regressions[LIST] of STRING
+    '''
+    before = {result["board"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = before.get(result["board"])
+        if old is None:
+            continue
+        name = result["board"]
+        if old["status"] == "solved" and result["status"] != "solved":
+            regressions.append("%s: %s, was solved" % (name, result["status"]))
+            continue
+        if result["status"] != "solved":
+            continue
+        if old["length"] is not None and result["length"] > old["length"]:
+            regressions.append("%s: %d moves, was %d" % (name, result["length"], old["length"]))
+        if old["optimal"] and result["optimal"] is False:
+            regressions.append("%s: %d moves, optimal is %d" % (name, result["length"], result["optimal_length"]))
+        if baseline.get("method") != "hda" and old["status"] == "solved" \
+                and result["nodes_expanded"] > old["nodes_expanded"]:
+            regressions.append("%s: %d nodes expanded, was %d" % (name, result["nodes_expanded"], old["nodes_expanded"]))
+        if old["nodes_per_second"] and result["nodes_per_second"] is not None \
+                and result["nodes_per_second"] < (1-tolerance)*old["nodes_per_second"]:
+            regressions.append("%s: %.0f nodes/s, was %.0f" % (name, result["nodes_per_second"], old["nodes_per_second"]))
+    return regressions
+
+
+def parse_depths(text):
+    '''"1-14" or "3,5,7" to a list of depths'''
+    depths = []
+    for part in text.split(","):
+        low, _, high = part.partition("-")
+        depths += range(int(low), int(high or low)+1)
+    return depths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the 2021 solver on seeded scrambled boards")
+    parser.add_argument("--depths", default="1-14", help="scramble depths, e.g. 1-14 or 3,5,7")
+    parser.add_argument("--boards", type=int, default=3, help="boards per depth")
+    parser.add_argument("--seed", type=int, default=2021)
+    parser.add_argument("--method", default="astar", choices=sorted(set(solver2021.SEARCH_METHODS) - {"anytime"}))
+    parser.add_argument("--size", default="5x5", help="board shape, rows x columns")
+    parser.add_argument("--rings", type=int, default=None, help="rotating rings (default: all of them)")
+    parser.add_argument("--time-limit", type=float, default=60, help="seconds allowed per board")
+    parser.add_argument("--max-nodes", type=int, default=None, help="expanded boards allowed per board")
+    parser.add_argument("--write", help="save the results as a JSON baseline")
+    parser.add_argument("--baseline", help="JSON baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed drop in nodes per second, as a fraction of the baseline's")
+    args = parser.parse_args()
+
+    rows, _, cols = args.size.partition("x")
+    solver2021.configure(int(rows), int(cols), args.rings)
+    settings = {"seed": args.seed, "method": args.method, "size": "%dx%d" % (solver2021.ROWS, solver2021.COLS),
+                "rings": solver2021.RINGS}
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+        mismatches = baseline_mismatches(baseline, settings)
+        if mismatches:
+            raise(Exception("Error: baseline was written for other boards: " + "; ".join(mismatches)))
+    boards = scrambled_boards(parse_depths(args.depths), args.boards, args.seed)
+    results = []
+    for result in run_benchmark(boards, args.method, args.max_nodes, args.time_limit):
+        print(json.dumps(result))
+        sys.stdout.flush()
+        results.append(result)
+
+    if args.write:
+        with open(args.write, 'w') as file:
+            json.dump(dict(settings, time_limit=args.time_limit, max_nodes=args.max_nodes, results=results), file, indent=1)
+    if baseline is not None:
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION " + regression, file=sys.stderr)
+        sys.exit(1 if regressions else 0)
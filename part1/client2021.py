@@ -0,0 +1,67 @@
+#!/usr/local/bin/python3
+# client2021.py : Solve a 2021 board with a running daemon2021.py server
+#
+# Code by: Harsh K Atha (hatha), Aashay Gondalia (aagond)
+#
+# Usage: ./client2021.py board_file [--socket PATH] [--method astar] [--time-limit S]
+#
+# Prints the same output as solver2021.py. Only the standard library is imported, so the
+# client starts in milliseconds and the server does the rest.
+
+import os
+import json
+import math
+import socket
+import argparse
+import tempfile
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "solver2021.sock")
+# Every method of solver2021.SEARCH_METHODS that returns a single route
+METHODS = ["astar", "bidirectional", "hda", "ida"]
+
+
+def request_solution(board, path=DEFAULT_SOCKET, method="astar", time_limit=None, max_nodes=None):
+    '''
+    Send one board to the server and wait for its result.
+
+    ARGS    : board[TUPLE], path[STRING], method[STRING], time_limit[FLOAT], max_nodes[INT]
+    RETURNS : result[DICT]
+    '''
+    request = {"id": 0, "board": list(board), "method": method, "time_limit": time_limit, "max_nodes": max_nodes}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        connection.sendall((json.dumps(request) + "\n").encode())
+        with connection.makefile("rb") as replies:
+            reply = replies.readline()
+    if not reply:
+        raise(Exception("Error: server closed the connection"))
+    return json.loads(reply)
+
+
+def printable_board(board):
+    cols = math.isqrt(len(board))
+    return [ ('%3d ')*cols  % tuple(board[j:(j+cols)]) for j in range(0, len(board), cols) ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve a 2021 board with a running daemon2021.py")
+    parser.add_argument("board", help="board file")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket path")
+    parser.add_argument("--method", default="astar", choices=METHODS)
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds allowed for the board")
+    args = parser.parse_args()
+
+    start_state = []
+    with open(args.board, 'r') as file:
+        for line in file:
+            start_state += [ int(i) for i in line.split() ]
+
+    print("Start state: \n" +"\n".join(printable_board(tuple(start_state))))
+
+    print("Solving...")
+    result = request_solution(tuple(start_state), args.socket, args.method, args.time_limit)
+    if result["status"] != "solved":
+        raise(Exception("Error: " + result["status"].replace("error: ", "", 1)))
+    route = result["moves"]
+    
+    print("Solution found in " + str(len(route)) + " moves:" + "\n" + " ".join(route))
@@ -0,0 +1,215 @@
+#!/usr/local/bin/python3
+# daemon2021.py : Long-running 2021 solver behind a Unix domain socket
+#
+# Code by: Harsh K Atha (hatha), Aashay Gondalia (aagond)
+#
+# Usage: ./daemon2021.py [--socket PATH] [--workers N] [--no-cache]
+#
+# The server imports solver2021 once, so its tables are built (and the pattern databases
+# mapped) a single time, and then forks a pool of workers that share them. Clients send one
+# JSON object per line, {"id": ..., "board": [25 numbers], "method": ..., "time_limit": ...,
+# "max_nodes": ...}, and get one JSON line back per request, in the order they finish:
+# {"id": ..., "status": "solved", "moves": [...], "length": N, "nodes_expanded": N,
+# "wall_time": S}, or a status naming the limit hit or the error. A client may shut down its
+# writing side once it has sent its boards and still gets every answer; when it closes the
+# connection, the searches still running for it are cancelled. Boards already in the
+# solved-board cache are answered from it and the ones solved are added to it, unless
+# --no-cache is given.
+#
+# client2021.py solves one board file through the server and prints it the same way
+# solver2021.py does.
+
+import sys
+import os
+import json
+import time
+import select
+import asyncio
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import solver2021
+import client2021
+
+# Requests in flight at once, across all clients; each has its own cancellation flag
+MAX_IN_FLIGHT = 1024
+# Seconds between checks that a client which stopped sending is still there for its answers
+HANGUP_POLL_INTERVAL = 0.2
+METHODS = client2021.METHODS
+
+# One flag per in-flight request, shared with the workers, set when its client goes away
+_cancel_flags = None
+# Whether the workers use the solved-board cache
+_use_cache = False
+
+
+def _init_worker(cancel_flags, cache):
+    global _cancel_flags, _use_cache
+    _cancel_flags = cancel_flags
+    _use_cache = cache
+
+
+def solve_request(slot, board, method, time_limit, max_nodes):
+    '''
+    Worker entry point: solve one board, giving up once the slot's cancellation flag is set.
+
+    ARGS    : slot[INT], board[TUPLE], method[STRING], time_limit[FLOAT], max_nodes[INT]
+    RETURNS : result[DICT]
+    '''
+    start = time.monotonic()
+    budget = solver2021.SearchBudget(max_nodes, time_limit, cancelled=lambda: _cancel_flags[slot])
+    if _cancel_flags[slot]:
+        #The client left while the request was queued
+        return {"status": "cancelled", "moves": None, "length": None, "nodes_expanded": 0, "wall_time": 0.0}
+    try:
+        moves = solver2021.solve(board, method, cache=_use_cache, budget=budget)
+        status = "solved"
+    except solver2021.SearchLimitReached as limit:
+        moves = None
+        status = str(limit)
+    return {"status": status,
+            "moves": moves,
+            "length": None if moves is None else len(moves),
+            "nodes_expanded": budget.nodes_expanded,
+            "wall_time": time.monotonic() - start}
+
+
+def parse_request(line):
+    '''
+    Check one request line.
+
+    ARGS    : line[BYTES]
+    RETURNS : request[DICT] with board as a tuple
+    '''
+    request = json.loads(line)
+    if not isinstance(request, dict):
+        raise ValueError("expected a JSON object")
+    board = request.get("board")
+    if not isinstance(board, list) or not all(type(tile) is int for tile in board) \
+            or sorted(board) != list(solver2021.GOAL_STATE):
+        raise ValueError("board must hold the tiles 1 to %d once each" % (solver2021.ROWS*solver2021.COLS))
+    if request.get("method", "astar") not in METHODS:
+        raise ValueError("unknown search method " + str(request["method"]))
+    for limit in ("time_limit", "max_nodes"):
+        value = request.get(limit)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0):
+            raise ValueError(limit + " must be a non-negative number")
+    request["board"] = tuple(board)
+    return request
+
+
+def request_id(line):
+    '''The id of a request that failed to parse, when it is at least a JSON object'''
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return None
+    return {"id": request.get("id")} if isinstance(request, dict) else None
+
+
+def client_gone(writer):
+    '''
+    Whether the client closed the connection, as opposed to only shutting down its writing
+    side: the socket then reports a hangup.
+
+    ARGS    : writer[asyncio.StreamWriter]
+    RETURNS : gone[BOOL]
+    '''
+    if writer.is_closing():
+        return True
+    poller = select.poll()
+    poller.register(writer.get_extra_info("socket").fileno(), select.POLLHUP)
+    return bool(poller.poll(0))
+
+
+class SolverServer:
+    '''Accepts client connections and hands their boards to the worker pool'''
+    def __init__(self, workers=None, cache=False):
+        context = solver2021.fork_context()
+        self.cancel_flags = context.Array("b", MAX_IN_FLIGHT, lock=False)
+        self.free_slots = list(range(MAX_IN_FLIGHT))
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                            initializer=_init_worker, initargs=(self.cancel_flags, cache))
+
+    async def handle_request(self, request, slots):
+        if not self.free_slots:
+            return {"status": "error: server busy"}
+        slot = self.free_slots.pop()
+        self.cancel_flags[slot] = 0
+        slots.add(slot)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, solve_request, slot, request["board"], request.get("method", "astar"),
+                request.get("time_limit"), request.get("max_nodes"))
+        finally:
+            slots.discard(slot)
+            self.free_slots.append(slot)
+
+    def cancel(self, slots):
+        for slot in slots:
+            self.cancel_flags[slot] = 1
+
+    async def respond(self, line, writer, slots):
+        request = None
+        try:
+            request = parse_request(line)
+            result = await self.handle_request(request, slots)
+        except Exception as error:
+            #Every request gets an answer, even when it or its worker fails
+            result = {"status": solver2021.error_status(error)}
+            if request is None:
+                request = request_id(line)
+        if request is not None:
+            result["id"] = request.get("id")
+        if writer.is_closing():
+            return
+        try:
+            writer.write((json.dumps(result) + "\n").encode())
+            await writer.drain()
+        except ConnectionError:
+            # The client is gone: stop its other searches, they will come back as "cancelled"
+            self.cancel(slots)
+
+    async def serve_client(self, reader, writer):
+        slots = set()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.ensure_future(self.respond(line, writer, slots))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            self.cancel(slots)
+        try:
+            # No more requests: answer the ones in flight while the client waits for them,
+            # and stop its searches, which come back as "cancelled", once it has left
+            while tasks:
+                if client_gone(writer):
+                    self.cancel(slots)
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    break
+                await asyncio.wait(tasks, timeout=HANGUP_POLL_INTERVAL)
+        finally:
+            writer.close()
+
+    async def serve(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(self.serve_client, path)
+        print("Serving on " + path)
+        sys.stdout.flush()
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve 2021 boards sent over a Unix socket, see client2021.py")
+    parser.add_argument("--socket", default=client2021.DEFAULT_SOCKET, help="Unix socket path")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--no-cache", action="store_true", help="search every board instead of answering boards already in the solved-board cache")
+    args = parser.parse_args()
+
+    asyncio.run(SolverServer(args.workers, not args.no_cache).serve(args.socket))
@@ -0,0 +1,182 @@
+#!/usr/local/bin/python3
+# endgame2021.py : Build the endgame table for the 2021 puzzle solver
+#
+# Code by: Harsh K Atha (hatha), Aashay Gondalia (aagond)
+#
+# A breadth-first search from the goal that lists every board within depth moves of it,
+# with its distance and the last move that reached it. Layers are kept on disk rather
+# than in memory: the children of each chunk of a layer are sorted, stripped of duplicates
+# and of boards already in the two layers before, and written out as a sorted run. The runs
+# are then merged into the next layer. All layers are finally merged into one sorted table,
+# followed by its board count, and moved into place once complete; solver2021.py
+# memory-maps it on startup.
+#
+# Usage: ./endgame2021.py [depth] [--size 5x5] [--rings N]   (depth 5 by default)
+#
+# Tables for other board shapes go to that shape's directory, see solver2021.pattern_directory.
+
+import sys
+import os
+import shutil
+import tempfile
+import argparse
+import numpy as np
+import solver2021
+
+DEFAULT_DEPTH = 5
+CHUNK_SIZE = 1 << 16
+MERGE_BLOCK = 1 << 18
+
+
+def key_dtype():
+    '''Packed boards as fixed-size byte strings, for the board shape solver2021 is configured for'''
+    return np.dtype("S%d" % solver2021.ENDGAME_KEY_SIZE)
+
+
+def tile_sum():
+    '''Tiles 1 to ROWS*COLS add up to this, which gives the tile a packed board leaves out'''
+    return sum(range(1, solver2021.ROWS*solver2021.COLS+1))
+
+
+def write_run(path, keys, info):
+    keys.tofile(path + ".keys")
+    info.tofile(path + ".info")
+
+
+def read_run(path):
+    '''
+    Memory-map a run written by write_run.
+
+    ARGS    : path[STRING] without extension
+    RETURNS : keys[np.ndarray of key_dtype()], info[np.ndarray of uint8, shape (n, 2)]
+    '''
+    if not os.path.getsize(path + ".keys"):
+        return np.empty(0, dtype=key_dtype()), np.empty((0, 2), dtype=np.uint8)
+    keys = np.memmap(path + ".keys", dtype=key_dtype(), mode="r")
+    info = np.memmap(path + ".info", dtype=np.uint8, mode="r").reshape(-1, 2)
+    return keys, info
+
+
+def is_member(keys, sorted_keys):
+    '''Mask of the keys that are also in sorted_keys'''
+    if not len(sorted_keys):
+        return np.zeros(len(keys), dtype=bool)
+    index = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys)-1)
+    return sorted_keys[index] == keys
+
+
+def expand_chunk(keys, depth, exclude):
+    '''
+    Children of a chunk of packed boards, sorted and without duplicates or boards found
+    in the exclude runs.
+
+    ARGS    : keys[np.ndarray of key_dtype()], depth[INT] of the children, exclude[LIST] of sorted keys
+    RETURNS : keys[np.ndarray of key_dtype()], info[np.ndarray of uint8, shape (n, 2)]
+    '''
+    packed = np.frombuffer(keys.tobytes(), dtype=np.uint8).reshape(-1, solver2021.ENDGAME_KEY_SIZE)
+    boards = np.empty((len(packed), solver2021.ROWS*solver2021.COLS), dtype=np.uint8)
+    boards[:, :-1] = packed
+    boards[:, -1] = tile_sum() - packed.sum(axis=1, dtype=np.int64)
+    children = solver2021.batch_successors(boards)[:, :-1]
+    child_keys = np.ascontiguousarray(children).view(key_dtype()).ravel()
+    moves = np.tile(np.arange(len(solver2021.MOVE_NAMES), dtype=np.uint8), len(packed))
+    child_keys, first = np.unique(child_keys, return_index=True)
+    keep = np.ones(len(child_keys), dtype=bool)
+    for sorted_keys in exclude:
+        keep &= ~is_member(child_keys, sorted_keys)
+    info = np.empty((keep.sum(), 2), dtype=np.uint8)
+    info[:, 0] = depth
+    info[:, 1] = moves[first[keep]]
+    return child_keys[keep], info
+
+
+def merge_runs(runs, path):
+    '''
+    Merge sorted runs into one sorted run at path, keeping the first of equal keys. Only a
+    block of each run is in memory at a time: everything up to the smallest of the blocks'
+    last keys is taken from every run, so no key is left behind for a later block.
+
+    ARGS    : runs[LIST] of (keys, info), path[STRING] without extension
+    RETURNS : size[INT] of the merged run
+    '''
+    positions = [0]*len(runs)
+    size = 0
+    with open(path + ".keys", "wb") as keys_file, open(path + ".info", "wb") as info_file:
+        while True:
+            active = [i for i, (keys, _) in enumerate(runs) if positions[i] < len(keys)]
+            if not active:
+                return size
+            bound = min(runs[i][0][min(positions[i]+MERGE_BLOCK, len(runs[i][0]))-1] for i in active)
+            block_keys, block_info = [], []
+            for i in active:
+                keys, info = runs[i]
+                start = positions[i]
+                end = start + np.searchsorted(keys[start:start+MERGE_BLOCK], bound, side="right")
+                block_keys.append(keys[start:end])
+                block_info.append(info[start:end])
+                positions[i] = end
+            keys, first = np.unique(np.concatenate(block_keys), return_index=True)
+            keys.tofile(keys_file)
+            np.concatenate(block_info)[first].tofile(info_file)
+            size += len(keys)
+
+
+def build_endgame_table(depth, directory=None):
+    '''
+    Breadth-first search from the goal to the given depth with disk-backed layers, then
+    merge the layers into the endgame table.
+
+    ARGS    : depth[INT], directory[STRING]
+    RETURNS : path[STRING] of the table, without extension
+    '''
+    directory = directory or solver2021.PDB_DIRECTORY
+    os.makedirs(directory, exist_ok=True)
+    work = tempfile.mkdtemp(dir=directory)
+    try:
+        layer_paths = [os.path.join(work, "layer_0")]
+        write_run(layer_paths[0], np.array([solver2021.pack_board(solver2021.GOAL_STATE)], dtype=key_dtype()),
+                  np.array([[0, 0]], dtype=np.uint8))
+        for layer in range(1, depth+1):
+            previous = read_run(layer_paths[-1])[0]
+            # Moves cost 1 and can all be undone, so the children of layer d-1 lie in
+            # layers d-2, d-1 or d
+            exclude = [read_run(path)[0] for path in layer_paths[-2:]]
+            run_paths = []
+            for start in range(0, len(previous), CHUNK_SIZE):
+                run_paths.append(os.path.join(work, "run_%d_%d" % (layer, len(run_paths))))
+                write_run(run_paths[-1], *expand_chunk(previous[start:start+CHUNK_SIZE], layer, exclude))
+            layer_paths.append(os.path.join(work, "layer_%d" % layer))
+            size = merge_runs([read_run(path) for path in run_paths], layer_paths[-1])
+            for path in run_paths:
+                os.remove(path + ".keys")
+                os.remove(path + ".info")
+            print("Depth %d: %d boards" % (layer, size))
+            sys.stdout.flush()
+
+        # Merged in the work directory and only then moved into place, so neither a search
+        # nor an interrupted build ever leaves a half-written table where the solver looks
+        merged = os.path.join(work, "table")
+        size = merge_runs([read_run(layer_path) for layer_path in layer_paths], merged)
+        with open(merged + ".info", "ab") as file:
+            file.write(size.to_bytes(solver2021.ENDGAME_COUNT_SIZE, "little"))
+        path = os.path.join(directory, solver2021.endgame_filename(depth))
+        # The solver finds tables by their key file, so it goes last
+        os.replace(merged + ".info", path + ".info")
+        os.replace(merged + ".keys", path + ".keys")
+        return path
+    finally:
+        shutil.rmtree(work)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the endgame table for the 2021 solver")
+    parser.add_argument("depth", type=int, nargs="?", default=DEFAULT_DEPTH, help="moves from the goal covered")
+    parser.add_argument("--size", default="5x5", help="board shape, rows x columns")
+    parser.add_argument("--rings", type=int, default=None, help="rotating rings (default: all of them)")
+    args = parser.parse_args()
+    if not 0 < args.depth < 255:
+        raise(Exception("Error: depth must be between 1 and 254"))
+
+    rows, _, cols = args.size.partition("x")
+    solver2021.configure(int(rows), int(cols), args.rings)
+    print("Built " + build_endgame_table(args.depth))
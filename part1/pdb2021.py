@@ -0,0 +1,113 @@
+#!/usr/local/bin/python3
+# pdb2021.py : Build pattern databases for the 2021 puzzle solver
+#
+# Code by: Harsh K Atha (hatha), Aashay Gondalia (aagond)
+#
+# A pattern database only tracks where a subset of the tiles are and ignores the rest.
+# A breadth-first search from the goal over these abstract states, using the same moves
+# as solver2021.py (24 on 5x5, len(solver2021.MOVE_NAMES) on any shape), gives the fewest moves needed to bring the subset home from
+# every placement. That never overestimates the real number of moves, so the solver can
+# take the max of several lookups as its heuristic.
+#
+# Usage: ./pdb2021.py [tiles ...] [--size 5x5] [--rings N]   e.g. ./pdb2021.py 1,2,3,4,5 21,22,23,24,25
+# Each argument is one comma-separated tile subset. The tables are written to the pdb
+# directory next to solver2021.py, where the solver memory-maps them on startup; tables
+# for other board shapes go to that shape's directory, see solver2021.pattern_directory.
+
+import os
+import tempfile
+import argparse
+import numpy as np
+import solver2021
+
+UNVISITED = 255
+CHUNK_SIZE = 1 << 16
+
+
+def default_subsets():
+    '''
+    Goal rows, the tiles that row moves carry around together. The solver looks every table
+    up for the symmetric subsets as well, so the top half of the rows covers all rows and columns.
+
+    RETURNS : subsets[LIST] of TUPLE, for the board shape solver2021 is configured for
+    '''
+    return [tuple(range(row*solver2021.COLS+1, (row+1)*solver2021.COLS+1)) for row in range((solver2021.ROWS+1)//2)]
+
+
+def build_pattern_database(tiles):
+    '''
+    Backward breadth-first search from the goal placement of the given tiles.
+    Abstract states are ranked the same way as solver2021.pattern_index, one byte each.
+
+    ARGS    : tiles[TUPLE]
+    RETURNS : table[np.ndarray of uint8], UNVISITED where a placement cannot be reached
+    '''
+    cells = solver2021.ROWS * solver2021.COLS
+    weights = cells ** np.arange(len(tiles)-1, -1, -1, dtype=np.int64)
+    table = np.full(cells ** len(tiles), UNVISITED, dtype=np.uint8)
+    # Tile t sits in cell t-1 on the goal board
+    frontier = np.array([np.dot(np.array(tiles, dtype=np.int64) - 1, weights)])
+    table[frontier] = 0
+    depth = 0
+    # Every move has its inverse in the move set, so searching forward from the goal
+    # gives the same distances as searching backward to it.
+    while frontier.size:
+        depth += 1
+        if depth >= UNVISITED:
+            raise(Exception("Error: pattern database depth does not fit in one byte"))
+        next_frontier = []
+        for start in range(0, frontier.size, CHUNK_SIZE):
+            positions = (frontier[start:start+CHUNK_SIZE, None] // weights) % cells
+            children = (solver2021.MOVE_DESTINATIONS[:, positions] * weights).sum(axis=2).ravel()
+            children = np.unique(children)
+            children = children[table[children] == UNVISITED]
+            table[children] = depth
+            next_frontier.append(children)
+        frontier = np.concatenate(next_frontier)
+    return table
+
+
+def write_pattern_database(tiles, directory=None):
+    '''
+    Build the table for the tiles and write it to the pdb directory. It is written under a
+    temporary name and then renamed, so an interrupted build never leaves a short table
+    where the solver would map it on import.
+
+    ARGS    : tiles[LIST] of INT, directory[STRING]
+    RETURNS : path[STRING] of the table
+    '''
+    directory = directory or solver2021.PDB_DIRECTORY
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, solver2021.pattern_database_filename(tiles))
+    table = build_pattern_database(tiles)
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as file:
+        try:
+            table.tofile(file)
+        except BaseException:
+            file.close()
+            os.remove(file.name)
+            raise
+    os.chmod(file.name, 0o644)
+    os.replace(file.name, path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build pattern databases for the 2021 solver")
+    parser.add_argument("tiles", nargs="*", help="comma-separated tile subsets (default: the top half of the goal rows)")
+    parser.add_argument("--size", default="5x5", help="board shape, rows x columns")
+    parser.add_argument("--rings", type=int, default=None, help="rotating rings (default: all of them)")
+    args = parser.parse_args()
+
+    rows, _, cols = args.size.partition("x")
+    solver2021.configure(int(rows), int(cols), args.rings)
+    subsets = [tuple(int(tile) for tile in arg.split(",")) for arg in args.tiles] or default_subsets()
+    covered = set()
+    for tiles in subsets:
+        if len(set(tiles)) != len(tiles) or not all(1 <= tile <= solver2021.ROWS*solver2021.COLS for tile in tiles):
+            raise(Exception("Error: invalid tile subset " + ",".join(map(str, tiles))))
+        if frozenset(tiles) in covered:
+            print("Skipped " + ",".join(map(str, tiles)) + ": symmetric to a subset already built")
+            continue
+        covered.update(frozenset(source_tiles) for source_tiles, _ in solver2021.symmetric_subsets(tiles))
+        print("Built " + write_pattern_database(tiles))
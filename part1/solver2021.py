@@ -12,191 +12,1257 @@
     #3. To find coordinates of elements in a nested list, I referred https://stackoverflow.com/questions/53319487/finding-the-index-of-elements-in-nested-list?rq=1
 
 import sys
+import os
+import mmap
+import time
+import bisect
+import queue
+import sqlite3
+import multiprocessing
 import numpy as np
-import copy
-from queue import PriorityQueue
+from collections import Counter, namedtuple
+from heapq import heappop, heappush
+from itertools import count
+from operator import itemgetter
 
 ROWS=5
 COLS=5
+#Number of rings that rotate, from the outside in: the outer (O) and inner (I) ring on 5x5
+RINGS=2
+
+# States are flat, hashable tuples of ROWS*COLS tiles in row-major order, the same
+# layout the start board is read in. Every move below builds its result by slicing
+# the parent tuple, so no per-node deepcopy or list-of-lists round-trip is needed.
+# GOAL_STATE and every table below are built for the board shape by configure().
 
 def printable_board(board):
     return [ ('%3d ')*COLS  % board[j:(j+COLS)] for j in range(0, ROWS*COLS, COLS) ]
 
 
-def heuristic_used(board):
-    
-    #Split the board and took corners, vertices of inner ring and the center most element.
-    
-    groups=[1,5,21,25,13,8,12,18,14]
-    """
-    groups is a combination of following 3 subgroups
-    
-    
-    1 _ _ _ 5                         _ _ _ _ _                             _ _ _ _ _
-    _ _ _ _ _                         _ _ _ _ _                             _ _  8 _ _ 
-    _ _ _ _ _                         _ _ 13 _ _                            _ 12 _14 _
-    _ _ _ _ _                         _ _ _ _ _                             _ _ 18 _ _
-    21 _ _ _ 25                       _ _ _ _ _                             _ _ _ _ _
-    
-    Corners of the goal state       Center most element of goal state       Vertices of Inner ring
-    Subgroup 1                      Subgroup 2                              Subgroup 3
-    """
+#Split the board and took corners, vertices of inner ring and the center most element.
+"""
+HEURISTIC_TILES is a combination of following 3 subgroups, shown here on 5x5
+
+
+1 _ _ _ 5                         _ _ _ _ _                             _ _ _ _ _
+_ _ _ _ _                         _ _ _ _ _                             _ _  8 _ _ 
+_ _ _ _ _                         _ _ 13 _ _                            _ 12 _14 _
+_ _ _ _ _                         _ _ _ _ _                             _ _ 18 _ _
+21 _ _ _ 25                       _ _ _ _ _                             _ _ _ _ _
+
+Corners of the goal state       Center most element of goal state       Vertices of Inner ring
+Subgroup 1                      Subgroup 2                              Subgroup 3
+"""
+
+def build_heuristic_groups():
+    """The three subgroups above for a ROWS x COLS board, as lists of tiles"""
+    middle_row, middle_col = ROWS//2, COLS//2
+    corners = [1, COLS, (ROWS-1)*COLS+1, ROWS*COLS]
+    center = [middle_row*COLS+middle_col+1]
+    inner_ring = [COLS+middle_col+1, middle_row*COLS+2, (ROWS-2)*COLS+middle_col+1, middle_row*COLS+COLS-1]
+    return [corners, center, list(dict.fromkeys(inner_ring))]
+
+def build_distance_table():
+    """For every tile in HEURISTIC_TILES, the shortest Manhattan distance to its goal from each of the ROWS*COLS cells"""
     # Tupled coordinates of selected groups of goal state
-    goal_coord=[(0,0),(0,4),(4,0),(4,4),(2,2),(1,2),(2,1),(3,2),(2,3)]   
-    coordinates=[]
+    goal_coord=[divmod(tile-1, COLS) for tile in HEURISTIC_TILES]
     
-    #Below section stores coordinates of selected group from current state in a list: coordinates
-    for tile in groups:
-        for ind, row in enumerate(board):
-            if tile in row:
-                coordinates.append((ind,row.index(tile)))
-    
-    min_dist_list=[]
+    distance_table=[]
     #Below part finds the shortest Manhattan distance to it's goal state
     for i in range(len(goal_coord)):
-        dist1= abs(goal_coord[i][0]-coordinates[i][0])+abs(goal_coord[i][1]-coordinates[i][1])
-        dist2= ROWS-abs(goal_coord[i][0]-coordinates[i][0])+abs(goal_coord[i][1]-coordinates[i][1])
-        dist3= abs(goal_coord[i][0]-coordinates[i][0])+COLS-abs(goal_coord[i][1]-coordinates[i][1])
-        dist4= ROWS-abs(goal_coord[i][0]-coordinates[i][0]) +COLS-abs(goal_coord[1][0]-coordinates[i][1])
-        min_dist_list.append(min(dist1,dist2,dist3,dist4))
-    
-    #Returns Max of manhattan of subgroup1 + Middle element + Max of manhattan of subgroup3
-    return max(min_dist_list[:3])+ min_dist_list[4]+ max(min_dist_list[5:])
+        min_dist_list=[]
+        for cell in range(ROWS*COLS):
+            coordinates=divmod(cell, COLS)
+            dist1= abs(goal_coord[i][0]-coordinates[0])+abs(goal_coord[i][1]-coordinates[1])
+            dist2= ROWS-abs(goal_coord[i][0]-coordinates[0])+abs(goal_coord[i][1]-coordinates[1])
+            dist3= abs(goal_coord[i][0]-coordinates[0])+COLS-abs(goal_coord[i][1]-coordinates[1])
+            dist4= ROWS-abs(goal_coord[i][0]-coordinates[0]) +COLS-abs(goal_coord[i][1]-coordinates[1])
+            min_dist_list.append(min(dist1,dist2,dist3,dist4))
+        distance_table.append(tuple(min_dist_list))
+    return distance_table
 
+def tile_positions(board):
+    """Index from tile to cell: entry t-1 is the cell holding tile t"""
+    where = [0]*(ROWS*COLS)
+    for cell, tile in enumerate(board):
+        where[tile-1] = cell
+    return tuple(where)
 
+def heuristic_components(where):
+    """Distance of each tile in HEURISTIC_TILES from its goal, looked up from DISTANCE_TABLE"""
+    return tuple(distances[where[tile-1]] for tile, distances in zip(HEURISTIC_TILES, DISTANCE_TABLE))
+
+def update_heuristic_components(components, where, next_where):
+    """
+    Components of a child, updated from the parent's: a move touches at most 16 cells,
+    so only the tracked tiles it carried to another cell need a new lookup.
+    """
+    return tuple(component if where[tile-1] == next_where[tile-1] else distances[next_where[tile-1]]
+                 for tile, distances, component in zip(HEURISTIC_TILES, DISTANCE_TABLE, components))
+
+def subgroup_bound(components, where):
+    #Returns Max of manhattan over the three subgroups. A move carries every tile at most one cell, so no
+    #tile's distance drops by more than 1 per move. The sum of the subgroup maxima is not admissible:
+    #a single row or column move can lower two or three of its terms at once.
+    return max(components)
+
+def build_displacement_tables():
+    """
+    For every tile, its wrap-around row and column distance to its goal from each cell, and
+    the most a single move can reduce the sums of those over the board. A move steps each
+    tile it carries by one cell: a column move steps ROWS tiles vertically, and turning a
+    ring steps its tiles along the ring, 2*(height-1) of them vertically.
+    """
+    vertical, horizontal = [], []
+    for tile in range(ROWS*COLS):
+        goal_row, goal_col = divmod(tile, COLS)
+        rows = [abs(goal_row-cell//COLS) for cell in range(ROWS*COLS)]
+        cols = [abs(goal_col-cell%COLS) for cell in range(ROWS*COLS)]
+        vertical.append(tuple(min(d, ROWS-d) for d in rows))
+        horizontal.append(tuple(min(d, COLS-d) for d in cols))
+    ring_sides = [(ROWS-2*ring, COLS-2*ring) for ring in range(RINGS)]
+    most_vertical = max([ROWS] + [2*(height-1) for height, _ in ring_sides])
+    most_horizontal = max([COLS] + [2*(width-1) for _, width in ring_sides])
+    most_total = max([ROWS, COLS] + [2*(height+width)-4 for height, width in ring_sides])
+    return vertical, horizontal, (most_vertical, most_horizontal, most_total)
+
+def displacement_bound(components, where):
+    """Moves needed to close the total wrap-around row and column displacement, at the most a move can close"""
+    vertical = sum([distances[cell] for distances, cell in zip(VERTICAL_DISTANCES, where)])
+    horizontal = sum([distances[cell] for distances, cell in zip(HORIZONTAL_DISTANCES, where)])
+    most_vertical, most_horizontal, most_total = DISPLACEMENT_LIMITS
+    return max(-(-vertical//most_vertical), -(-horizontal//most_horizontal), -(-(vertical+horizontal)//most_total))
+
+def ring_bound(components, where):
+    """
+    Turning a ring keeps every tile in its ring, and a row or column move carries at most
+    max(ROWS, COLS) tiles, so tiles outside their goal ring need at least this many moves
+    """
+    misplaced = sum([CELL_RINGS[cell] != ring for cell, ring in zip(where, CELL_RINGS)])
+    return -(-misplaced//max(ROWS, COLS))
+
+def pattern_database_bound(components, where):
+    #Pattern databases hold the exact number of moves needed to place their tile subset, take the strongest
+    h = 0
+    for tiles, cell_map, table in PATTERN_DATABASES:
+        h = max(h, table[pattern_index(where, tiles, cell_map)])
+    return h
+
+# The heuristic is the max of these admissible bounds, cheapest first. Each takes the tracked
+# tiles' distances (see heuristic_components) and the tile positions of a board.
+HEURISTIC_STACK = [("subgroups", subgroup_bound), ("displacement", displacement_bound),
+                   ("rings", ring_bound), ("pattern databases", pattern_database_bound)]
+
+def evaluate_heuristic(components, where, level=0, h=0, limit=None, stats=None):
+    """
+    Take the max of HEURISTIC_STACK from bound number level on, starting from the h found by
+    the bounds before it. Stops early once h is above limit, where the caller has no use for
+    a sharper value. Returns h and the level of the first bound not evaluated (the stack's
+    length once h is exact). stats counts every bound evaluated and every one that raised h.
+    """
+    for level in range(level, len(HEURISTIC_STACK)):
+        if limit is not None and h > limit:
+            return h, level
+        name, bound = HEURISTIC_STACK[level]
+        value = bound(components, where)
+        if stats is not None:
+            stats.heuristic_evaluations[name] += 1
+            if value > h:
+                stats.heuristic_raised[name] += 1
+        if value > h:
+            h = value
+    return h, len(HEURISTIC_STACK)
+
+def combine_heuristic(components, where):
+    return evaluate_heuristic(components, where)[0]
+
+def heuristic_used(board):
+    where = tile_positions(board)
+    return combine_heuristic(heuristic_components(where), where)
 
 
 def move_right(board, row):
-    
-      boardR=copy.deepcopy(board)
-      boardR[row] = boardR[row][-1:] + boardR[row][:-1]
-      return boardR
+    """Move the given row to one position right"""
+    start = row*COLS
+    line = board[start:start+COLS]
+    return board[:start] + line[-1:] + line[:-1] + board[start+COLS:]
 
 def move_left(board, row):
-    #"""Move the given row to one position left"""
-      #print('Row : ', row, '\nBoard L :', board[row])
-      boardL=copy.deepcopy(board)
-      boardL[row] = boardL[row][1:] + boardL[row][:1]
-      return boardL
-
-def rotate_right(board,row,residual):
-    board[row] = [board[row][0]] +[residual] + board[row][1:]
-    #print(' Rotate\n:' ,(board))
-    residual=board[row].pop()
-    return residual
-
-def rotate_left(board,row,residual):
-    
-    board[row] = board[row][:-1] + [residual] + [board[row][-1]]
-    residual=board[row].pop(0)
-    return residual
-
-def move_clockwise(board):
-    """Move the outer ring clockwise"""
-    boardC=copy.deepcopy(board)
-    boardC[0]=[boardC[1][0]]+boardC[0]
-    #print(boardC)
-    residual=boardC[0].pop()
-    #print(residual)
-    boardC=transpose_board(boardC)
-    #print(np.array(boardC))
-    residual=rotate_right(boardC,-1,residual)
-    #print(residual)
-    boardC=transpose_board(boardC)
-    residual=rotate_left(boardC,-1,residual)
-    boardC=transpose_board(boardC)
-    residual=rotate_left(boardC,0,residual)
-    boardC=transpose_board(boardC)
-    return boardC
-
-def move_cclockwise(board):
-    """Move the outer ring counter-clockwise"""
-    boardCC=copy.deepcopy(board)
-    boardCC[0]=boardCC[0]+[boardCC[1][-1]]
-    residual=boardCC[0].pop(0)
-    boardCC=transpose_board(boardCC)
-    residual=rotate_right(boardCC,0,residual)
-    boardCC=transpose_board(boardCC)
-    residual=rotate_right(boardCC,-1,residual)
-    boardCC=transpose_board(boardCC)
-    residual=rotate_left(boardCC,-1,residual)
-    boardCC=transpose_board(boardCC)
-    return boardCC
+    """Move the given row to one position left"""
+    start = row*COLS
+    line = board[start:start+COLS]
+    return board[:start] + line[1:] + line[:1] + board[start+COLS:]
+
+def move_up(board, col):
+    """Move the given column to one position up"""
+    return _shift_column(board, col, 1)
+
+def move_down(board, col):
+    """Move the given column to one position down"""
+    return _shift_column(board, col, -1)
+
+def _shift_column(board, col, step):
+    boardC = list(board)
+    column = board[col::COLS]
+    column = column[step:] + column[:step]
+    boardC[col::COLS] = column
+    return tuple(boardC)
+
+def ring_cells(ring):
+    """Flat indices of the given ring (0 = outer), listed in clockwise order from its top-left corner"""
+    top, left, bottom, right = ring, ring, ROWS-1-ring, COLS-1-ring
+    cells = [top*COLS+c for c in range(left, right+1)]
+    cells += [r*COLS+right for r in range(top+1, bottom+1)]
+    cells += [bottom*COLS+c for c in range(right-1, left-1, -1)]
+    cells += [r*COLS+left for r in range(bottom-1, top, -1)]
+    return cells
+
+def move_clockwise(board, ring=0):
+    """Move the given ring (outer ring by default) clockwise"""
+    cells = ring_cells(ring)
+    boardC = list(board)
+    for src, dest in zip(cells, cells[1:]+cells[:1]):
+        boardC[dest] = board[src]
+    return tuple(boardC)
+
+def move_cclockwise(board, ring=0):
+    """Move the given ring (outer ring by default) counter-clockwise"""
+    cells = ring_cells(ring)
+    boardCC = list(board)
+    for src, dest in zip(cells, cells[-1:]+cells[:-1]):
+        boardCC[dest] = board[src]
+    return tuple(boardCC)
 
 def transpose_board(board):
   """Transpose the board --> change row to column"""
-  boardT=copy.deepcopy(board)
-  return [list(col) for col in zip(*boardT)]
+  return tuple(board[r*COLS+c] for c in range(COLS) for r in range(ROWS))
 
 
-# return a list of possible successor states
-def successors(current_state):
+def ring_name(ring):
+    """O for the outer ring, I for the one inside it, I2, I3, ... further in"""
+    return "O" if ring == 0 else "I" if ring == 1 else "I"+str(ring)
+
+def apply_all_moves(current_state):
+    """Apply each move (24 of them on 5x5) to the board with the move functions above"""
     
     next_state = []
-    for i in range(ROWS):
-        boardL = move_left(current_state,i)
-        boardR = move_right(current_state,i)
-        boardU = transpose_board(move_left(transpose_board(current_state), i))
-        boardD = transpose_board(move_right(transpose_board(current_state), i))
-        next_state.append([boardL, "L"+ str(i+1)])
-        next_state.append([boardR, "R"+ str(i+1)])
-        next_state.append([boardU, "U"+str(i+1)])
-        next_state.append([boardD, "D"+str(i+1)])
-
-    boardOC = move_clockwise(current_state)
-    next_state.append([boardOC, "Oc"])
-    boardOCC = move_cclockwise(current_state)
-    next_state.append([boardOCC, "Occ"])
+    for i in range(max(ROWS, COLS)):
+        if i < ROWS:
+            next_state.append([move_left(current_state, i), "L"+ str(i+1)])
+            next_state.append([move_right(current_state, i), "R"+ str(i+1)])
+        if i < COLS:
+            next_state.append([move_up(current_state, i), "U"+str(i+1)])
+            next_state.append([move_down(current_state, i), "D"+str(i+1)])
+
+    for ring in range(RINGS):
+        next_state.append([move_clockwise(current_state, ring), ring_name(ring)+"c"])
+        next_state.append([move_cclockwise(current_state, ring), ring_name(ring)+"cc"])
     
-    boardIC=np.array(current_state)
-    inner_board=boardIC[1:-1,1:-1].tolist()
-    inner_board = move_clockwise(inner_board)
-    boardIC[1:-1,1:-1]=np.array(inner_board)
-    boardIC=boardIC.tolist()
-    next_state.append([boardIC, "Ic"])
+    return next_state
+
+
+# Every move is a fixed permutation of the board cells, so configure() compiles them once
+# by applying them to the identity board: row m of MOVE_TABLE lists, for each cell of
+# the child, which cell of the parent it is copied from. MOVE_DESTINATIONS is the inverse
+# view: MOVE_DESTINATIONS[m][p] is the cell a tile at p ends up in after move m. Every
+# move has an exact inverse in the move set (L<->R, U<->D, Oc<->Occ, Ic<->Icc), listed in
+# INVERSE_MOVES.
+def compile_moves():
+    identity = tuple(range(ROWS*COLS))
+    move_names = [move for _, move in apply_all_moves(identity)]
+    move_table = np.array([board for board, _ in apply_all_moves(identity)], dtype=np.intp)
+    inverse_moves = [next(j for j in range(len(move_names)) if (perm[move_table[j]] == np.arange(ROWS*COLS)).all())
+                     for perm in move_table]
+    return move_names, move_table, np.argsort(move_table, axis=1), inverse_moves
+
+
+# A move filter is a finite-state machine over the moves taken so far: allowed[state] lists
+# the moves worth trying next and next_state[state][move] is the state after taking one
+# (-1 where the move is not allowed). State 0 is the start of the search.
+MoveFilter = namedtuple("MoveFilter", ["allowed", "next_state"])
+
+def build_move_filter(max_length=3, shortening_only=False):
+    """
+    Find redundant move sequences by applying every sequence of up to max_length moves to
+    the identity board. A sequence is redundant when a shorter one gives the same board
+    (R1 L1, R1 R1 R1 = L1 L1, ...) or, unless shortening_only, when an equally long one
+    that comes first in move order does (R2 R1 = R1 R2, L1 U3 = U3 L1, ...). The filter's
+    states remember the last max_length-1 moves, which is enough to spot every redundant
+    sequence as it is completed.
+    """
+    identity = tuple(range(ROWS*COLS))
+    shortest = {identity: 0}
+    redundant = set()
+    #Grow sequences in order of length and then move order, only extending ones that are not redundant
+    layer = [((), identity)]
+    for length in range(1, max_length+1):
+        next_layer = []
+        for sequence, board in layer:
+            for move, getter in enumerate(MOVE_GETTERS):
+                longer = sequence + (move,)
+                if any(longer[i:] in redundant for i in range(1, length)):
+                    continue
+                next_board = getter(board)
+                if next_board not in shortest:
+                    shortest[next_board] = length
+                elif shortest[next_board] < length or not shortening_only:
+                    redundant.add(longer)
+                    continue
+                next_layer.append((longer, next_board))
+        layer = next_layer
     
-    boardICC=np.array(current_state)
-    inner_board=boardICC[1:-1,1:-1].tolist()
-    inner_board = move_cclockwise(inner_board)
-    boardICC[1:-1,1:-1]=np.array(inner_board)
-    boardICC=boardICC.tolist()
-    next_state.append([boardICC, "Icc"])
+    histories = [()]
+    state_ids = {(): 0}
+    allowed, next_state = [], []
+    for history in histories: #histories grows while we walk it
+        moves, transitions = [], [-1]*len(MOVE_NAMES)
+        for move in range(len(MOVE_NAMES)):
+            sequence = history + (move,)
+            if any(sequence[i:] in redundant for i in range(len(sequence))):
+                continue
+            next_history = sequence[-(max_length-1):] if max_length > 1 else ()
+            if next_history not in state_ids:
+                state_ids[next_history] = len(histories)
+                histories.append(next_history)
+            moves.append(move)
+            transitions[move] = state_ids[next_history]
+        allowed.append(tuple(moves))
+        next_state.append(transitions)
+    return MoveFilter(allowed, next_state)
+
+
+
+# A symmetry moves every tile from cell cells[c] to cell c (a reflection or transpose of the
+# board) and then renames tile t to relabel[t], so that the goal is mapped onto itself. The
+# moves are mapped onto each other as well: taking move m and then applying the symmetry
+# gives the same board as applying the symmetry and then taking move_map[m] (L1<->U1 under
+# the transpose, Oc<->Occ under a reflection, ...). Symmetric boards are therefore the
+# same number of moves from the goal.
+Symmetry = namedtuple("Symmetry", ["cells", "relabel", "move_map"])
+
+def transform_board(board, symmetry):
+    relabel = symmetry.relabel
+    return tuple([relabel[tile] for tile in itemgetter(*symmetry.cells)(board)])
+
+def build_symmetries():
+    """Every reflection (and transpose, on square boards) of the board that maps the move set onto itself"""
+    flip_rows = [(ROWS-1-r)*COLS+c for r in range(ROWS) for c in range(COLS)]
+    flip_cols = [r*COLS+(COLS-1-c) for r in range(ROWS) for c in range(COLS)]
+    candidates = [list(range(ROWS*COLS)), flip_rows, flip_cols, [flip_rows[cell] for cell in flip_cols]]
+    if ROWS == COLS:
+        transpose = [c*COLS+r for r in range(ROWS) for c in range(COLS)]
+        candidates += [[cells[cell] for cell in transpose] for cells in candidates]
     
-    return next_state
+    children = {board: move for move, board in enumerate(getter(GOAL_STATE) for getter in MOVE_GETTERS)}
+    symmetries = []
+    for cells in candidates:
+        relabel = [0]*(ROWS*COLS+1)
+        for cell, source in enumerate(cells):
+            relabel[source+1] = cell+1
+        symmetry = Symmetry(cells, relabel, [])
+        for getter in MOVE_GETTERS:
+            symmetry.move_map.append(children.get(transform_board(getter(GOAL_STATE), symmetry)))
+        if None not in symmetry.move_map:
+            symmetries.append(symmetry)
+    return symmetries
+
+
+def canonical_board(board):
+    """The smallest of the board's symmetric copies, shared by every board in its equivalence class"""
+    return min([transform_board(board, symmetry) for symmetry in SYMMETRIES])
+
+
+# Pattern databases are built offline by pdb2021.py: one byte per placement of a tile
+# subset, holding the fewest moves that bring those tiles home. They are memory-mapped
+# here so that startup cost does not depend on their size. A database for one tile subset
+# also answers for every symmetric subset (rows 1 and 5 and columns 1 and 5 all share the
+# row 1 table), so only one subset per equivalence class needs to be built and stored.
+# Tables for other board shapes are kept apart, in pdb_<rows>x<cols>_r<rings>.
+def pattern_directory():
+    directory = "pdb" if (ROWS, COLS, RINGS) == (5, 5, 2) else "pdb_%dx%d_r%d" % (ROWS, COLS, RINGS)
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), directory)
+
+def pattern_database_filename(tiles):
+    return "pdb_" + "-".join(str(tile) for tile in tiles) + ".bin"
+
+def pattern_index(where, tiles, cell_map=None):
+    """
+    Rank the cells holding the given tiles (see tile_positions) as one base ROWS*COLS
+    number, after renaming every cell through cell_map when one is given
+    """
+    index = 0
+    for tile in tiles:
+        cell = where[tile-1]
+        index = index*ROWS*COLS + (cell if cell_map is None else cell_map[cell])
+    return index
+
+def symmetric_subsets(tiles):
+    """
+    The distinct (tiles, cell_map) lookups a database for the given tiles answers: its own,
+    and one for each symmetric subset. Looking the subset's tiles up in the symmetric board
+    is the same as looking the matching tiles of the original board up through cell_map.
+    """
+    lookups = {}
+    for symmetry in SYMMETRIES:
+        cell_map = [0]*(ROWS*COLS)
+        for cell, source in enumerate(symmetry.cells):
+            cell_map[source] = cell
+        source_tiles = tuple(symmetry.cells[tile-1]+1 for tile in tiles)
+        lookups.setdefault(frozenset(source_tiles), (source_tiles, cell_map))
+    return list(lookups.values())
+
+def load_pattern_databases(directory=None):
+    """Memory-map every pattern database file found in the directory, with a lookup for each symmetric subset"""
+    directory = directory or PDB_DIRECTORY
+    databases = []
+    covered = set()
+    if not os.path.isdir(directory):
+        return databases
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith("pdb_") and name.endswith(".bin")):
+            continue
+        tiles = tuple(int(tile) for tile in name[4:-4].split("-"))
+        with open(os.path.join(directory, name), "rb") as file:
+            table = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(table) != (ROWS*COLS)**len(tiles):
+            raise(Exception("Error: pattern database " + name + " does not match the board size"))
+        for source_tiles, cell_map in symmetric_subsets(tiles):
+            if frozenset(source_tiles) not in covered:
+                covered.add(frozenset(source_tiles))
+                databases.append((source_tiles, cell_map, table))
+    return databases
+
+
+# The endgame table is built offline by endgame2021.py: every board within depth moves of
+# the goal, packed one byte per tile (the last tile is implied by the others) and sorted,
+# so a board is found by binary search in the memory-mapped key file. The info file holds
+# two bytes per board: its distance to the goal and the last move that generated it, then
+# the number of boards as a little-endian trailer, so a table cut short is refused.
+EndgameTable = namedtuple("EndgameTable", ["depth", "keys", "info", "offsets"])
+ENDGAME_COUNT_SIZE = 8
+
+def pack_board(board):
+    return bytes(board[:ENDGAME_KEY_SIZE])
+
+def endgame_filename(depth):
+    return "endgame_%d" % depth
+
+class _PackedKeys:
+    """The key file as a sequence of packed boards, so bisect can search it in place"""
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data) // ENDGAME_KEY_SIZE
+
+    def __getitem__(self, index):
+        return self.data[index*ENDGAME_KEY_SIZE:(index+1)*ENDGAME_KEY_SIZE]
+
+def load_endgame_table(directory=None):
+    """Memory-map the deepest endgame table found in the directory, or None if there is none"""
+    directory = directory or PDB_DIRECTORY
+    if not os.path.isdir(directory):
+        return None
+    depths = [int(name[8:-5]) for name in os.listdir(directory) if name.startswith("endgame_") and name.endswith(".keys")]
+    if not depths:
+        return None
+    path = os.path.join(directory, endgame_filename(max(depths)))
+    with open(path + ".keys", "rb") as file:
+        keys = _PackedKeys(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+    with open(path + ".info", "rb") as file:
+        info = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(keys.data) % ENDGAME_KEY_SIZE or len(info) != 2*len(keys) + ENDGAME_COUNT_SIZE \
+            or int.from_bytes(info[-ENDGAME_COUNT_SIZE:], "little") != len(keys):
+        raise(Exception("Error: endgame table " + path + " is damaged or incomplete, rebuild it with endgame2021.py"))
+    #Where the boards starting with each tile begin, to narrow every binary search down
+    first_tiles = np.frombuffer(keys.data, dtype=np.uint8)[::ENDGAME_KEY_SIZE]
+    offsets = np.searchsorted(first_tiles, np.arange(ROWS*COLS+2)).tolist()
+    return EndgameTable(max(depths), keys, info, offsets)
+
+
+def configure(rows=5, cols=5, rings=None):
+    """
+    Build the goal, heuristic tables, compiled moves, move filters and symmetries for a
+    rows x cols board with the given number of rotating rings (by default every ring with
+    more than one cell), and load the pattern databases and endgame table kept for that
+    shape. Everything in this module reads these globals, so one call switches the whole
+    engine over. It runs for 5x5 on import.
+    """
+    global ROWS, COLS, RINGS, GOAL_STATE, HEURISTIC_TILES, DISTANCE_TABLE
+    global VERTICAL_DISTANCES, HORIZONTAL_DISTANCES, DISPLACEMENT_LIMITS, CELL_RINGS
+    global MOVE_NAMES, MOVE_TABLE, MOVE_GETTERS, MOVE_DESTINATIONS, MOVE_DESTINATION_LISTS, INVERSE_MOVES
+    global MOVE_FILTER, SHORTEST_PATH_MOVE_FILTER, SYMMETRIES
+    global PDB_DIRECTORY, PATTERN_DATABASES, ENDGAME_KEY_SIZE, ENDGAME_TABLE
+    if rings is None:
+        rings = min(rows, cols)//2
+    if min(rows, cols) < 3 or rows*cols > 255 or not 0 <= rings <= min(rows, cols)//2:
+        raise(Exception("Error: unsupported board shape %dx%d with %d rings" % (rows, cols, rings)))
+    ROWS, COLS, RINGS = rows, cols, rings
+    GOAL_STATE = tuple(range(1, ROWS*COLS+1))
+    
+    HEURISTIC_TILES = [tile for group in build_heuristic_groups() for tile in group]
+    DISTANCE_TABLE = build_distance_table()
+    VERTICAL_DISTANCES, HORIZONTAL_DISTANCES, DISPLACEMENT_LIMITS = build_displacement_tables()
+    CELL_RINGS = [min(row, col, ROWS-1-row, COLS-1-col) for row, col in (divmod(cell, COLS) for cell in range(ROWS*COLS))]
+    
+    MOVE_NAMES, MOVE_TABLE, MOVE_DESTINATIONS, INVERSE_MOVES = compile_moves()
+    MOVE_GETTERS = [itemgetter(*perm) for perm in MOVE_TABLE.tolist()]
+    MOVE_DESTINATION_LISTS = MOVE_DESTINATIONS.tolist()
+    #Depth-first search has no duplicate detection, so it prunes every redundant sequence.
+    #With a closed set, pruning a sequence because an equally long one was preferred can lose
+    #the only route a stored board still allows (the board may have been reached first the
+    #other way), so searches that detect duplicates only prune sequences that can be shortened:
+    #those are never part of a shortest route, however the board was reached.
+    MOVE_FILTER = build_move_filter()
+    SHORTEST_PATH_MOVE_FILTER = build_move_filter(shortening_only=True)
+    SYMMETRIES = build_symmetries()
+    
+    PDB_DIRECTORY = pattern_directory()
+    PATTERN_DATABASES = load_pattern_databases()
+    ENDGAME_KEY_SIZE = ROWS*COLS-1
+    ENDGAME_TABLE = load_endgame_table()
+
+configure(ROWS, COLS, RINGS)
+
+def endgame_lookup(board):
+    """(distance to the goal, last move) for a board in ENDGAME_TABLE, None for one beyond it"""
+    key = pack_board(board)
+    keys = ENDGAME_TABLE.keys
+    index = bisect.bisect_left(keys, key, ENDGAME_TABLE.offsets[board[0]], ENDGAME_TABLE.offsets[board[0]+1])
+    if index < len(keys) and keys[index] == key:
+        return ENDGAME_TABLE.info[2*index], ENDGAME_TABLE.info[2*index+1]
+    return None
+
+def endgame_route(board):
+    """Moves from a board in ENDGAME_TABLE to the goal, undoing the last moves the table recorded"""
+    route_taken = []
+    while not is_goal(board):
+        entry = endgame_lookup(board)
+        if entry is None:
+            raise(Exception("Error: endgame table has no way home from a board it reached"))
+        undo = INVERSE_MOVES[entry[1]]
+        route_taken.append(MOVE_NAMES[undo])
+        board = MOVE_GETTERS[undo](board)
+    return route_taken
+
+
+# return a list of possible successor states
+def successors(current_state):
+    return [[getter(current_state), move] for getter, move in zip(MOVE_GETTERS, MOVE_NAMES)]
+
+def batch_successors(boards):
+    """
+    Expand an (N, ROWS*COLS) array of boards into an (N*M, ROWS*COLS) array with one
+    fancy-indexing call, where M = len(MOVE_NAMES) (24 on 5x5, 14 on 3x3, 30 on 6x6).
+    Row i*M+m holds move MOVE_NAMES[m] applied to board i.
+    """
+    boards = np.asarray(boards)
+    return boards[:, MOVE_TABLE].reshape(-1, ROWS*COLS)
     
 
 # check if we've reached the goal
 def is_goal(current_state):
-    goal_state= [[1, 2, 3, 4, 5], [6, 7, 8, 9, 10], [11, 12, 13, 14, 15], [16, 17, 18, 19, 20], [21, 22, 23, 24, 25]]
-    return current_state == goal_state
+    return current_state == GOAL_STATE
 
-def solve(initial_board):
-    
-    initial_board_list= list(initial_board)
-    #Referred below to find non-clunky way of creating nested list from list
-    #https://www.quora.com/How-do-I-create-a-nested-list-from-a-flat-one-in-Python
-    original_board = [initial_board_list[i:i + ROWS] for i in range(0, len(initial_board_list), ROWS)]
-    fringe = PriorityQueue()
-    fringe.put((0,original_board,'',0))
-    already_visited=[]
-    already_visited.append(original_board)
+def fork_context():
+    """
+    The multiprocessing context for worker processes: fork where the platform has it, so the
+    workers share the tables built on import instead of building them again
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+def error_status(error):
+    """The status reported for a board whose search failed: "error: " and what went wrong"""
+    #Errors here are raised as "Error: ...", which would read "error: Error: ..."
+    return "error: " + (str(error).replace("Error: ", "", 1) or type(error).__name__)
+
+class SearchLimitReached(Exception):
+    """Raised when a search uses up the node or time limit of its SearchBudget"""
+
+class SearchBudget:
+    """
+    Counts expanded boards and stops the search after max_nodes of them or time_limit seconds,
+    or once cancelled(), when given, returns true
+    """
+    def __init__(self, max_nodes=None, time_limit=None, cancelled=None):
+        self.max_nodes = max_nodes
+        self.deadline = None if time_limit is None else time.monotonic() + time_limit
+        self.cancelled = cancelled
+        self.nodes_expanded = 0
+
+    def spend(self):
+        #Checked before counting, so the board that trips the limit, never expanded, is not counted
+        if self.max_nodes is not None and self.nodes_expanded >= self.max_nodes:
+            raise SearchLimitReached("node limit")
+        self.nodes_expanded += 1
+        #Reading the clock costs far less than an expansion, so a time limit is kept to the board
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise SearchLimitReached("time limit")
+        if self.cancelled is not None and self.cancelled():
+            raise SearchLimitReached("cancelled")
+
+    def update(self, nodes_expanded):
+        """Take a node count tallied elsewhere (e.g. by worker processes) and check every limit"""
+        self.nodes_expanded = nodes_expanded
+        if self.max_nodes is not None and self.nodes_expanded > self.max_nodes:
+            raise SearchLimitReached("node limit")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise SearchLimitReached("time limit")
+        if self.cancelled is not None and self.cancelled():
+            raise SearchLimitReached("cancelled")
+
+class SearchStats:
+    """
+    Optional instrumentation for a search, passed as stats=SearchStats(). Counts boards
+    generated and expanded, children dropped because their board was already reached in
+    as few steps, and the peak fringe and closed-set sizes. Also splits the time spent
+    generating successors, evaluating the heuristic and on the fringe, and counts expanded
+    boards per f value, and how often each bound of HEURISTIC_STACK was evaluated and how
+    often it raised h above the bounds before it. When trace is given it is called as trace(stats, board, steps, f)
+    on every sample_every-th expansion. A search without stats does none of this.
+    """
+    def __init__(self, trace=None, sample_every=1000):
+        self.trace = trace
+        self.sample_every = sample_every
+        self.nodes_generated = 0
+        self.nodes_expanded = 0
+        self.duplicates_pruned = 0
+        self.peak_fringe = 0
+        self.peak_closed = 0
+        self.successor_time = 0.0
+        self.heuristic_time = 0.0
+        self.queue_time = 0.0
+        self.f_layers = Counter()
+        self.heuristic_evaluations = Counter()
+        self.heuristic_raised = Counter()
+
+    def expanded(self, board, steps, f, fringe_size, closed_size):
+        self.nodes_expanded += 1
+        self.f_layers[f] += 1
+        self.peak_fringe = max(self.peak_fringe, fringe_size)
+        self.peak_closed = max(self.peak_closed, closed_size)
+        if self.trace is not None and not self.nodes_expanded % self.sample_every:
+            self.trace(self, board, steps, f)
+
+    def as_dict(self):
+        return {"nodes_generated": self.nodes_generated, "nodes_expanded": self.nodes_expanded,
+                "duplicates_pruned": self.duplicates_pruned, "peak_fringe": self.peak_fringe,
+                "peak_closed": self.peak_closed, "successor_time": self.successor_time,
+                "heuristic_time": self.heuristic_time, "queue_time": self.queue_time,
+                "f_layers": {str(f): self.f_layers[f] for f in sorted(self.f_layers)},
+                "heuristic_evaluations": dict(self.heuristic_evaluations), "heuristic_raised": dict(self.heuristic_raised)}
+
+def astar_search(original_board, budget=None, symmetry=False, weight=1, cost_limit=None, stats=None):
+    """
+    A* over the whole state space, keeping every generated board in memory. With symmetry
+    the closed set is keyed by canonical_board, so only one board of each symmetry class is
+    stored and expanded. Routes are traced over the boards actually generated, so they need
+    no relabelling.
+    A weight above 1 orders the fringe by steps + weight*h (weighted A*), which finds a route
+    at most weight times the optimal length while expanding far fewer boards. Boards that
+    cannot lead to a route shorter than cost_limit moves are dropped. A SearchStats passed
+    as stats is filled in as the search goes.
+    With an ENDGAME_TABLE, children are looked up in it whenever their heuristic does not
+    already rule that out: a board in the table gets its exact distance as h, one outside it
+    at least depth+1. The search ends as soon as it pops a board from the table, whose route
+    home is then read from the table.
+    Children's heuristics are evaluated lazily: bounds of HEURISTIC_STACK are only taken
+    until the child's f is above the f being expanded, since it will not be popped before the
+    search moves past that f anyway. The rest of the stack is evaluated when it is popped,
+    and it goes back on the fringe if its f went up.
+    """
+    if ENDGAME_TABLE is not None and endgame_lookup(original_board) is not None:
+        return endgame_route(original_board)
+    #Every generated node is stored once in an arena: the index of the node it was
+    #generated from and a 1-byte move code. The route is only rebuilt for the goal.
+    parents = [-1]
+    moves_taken = bytearray(1)
+    #Fringe entries are (f, -g, node, board, tile positions, heuristic components, move
+    #filter state, h, level of the first heuristic bound not evaluated yet): among
+    #equal f the deeper node pops first, and arena indices keep the order deterministic
+    #without comparing boards
+    where = tile_positions(original_board)
+    components = heuristic_components(where)
+    h, level = evaluate_heuristic(components, where, stats=stats)
+    fringe = [(weight*h, 0, 0, original_board, where, components, 0, h, level)]
+    #Closed set keeps the best number of steps found so far for every board we generated
+    closed_key = canonical_board if symmetry else None
+    best_steps = {original_board if closed_key is None else closed_key(original_board): 0}
     
     while fringe :       
-        cost_heuristic , current_state, route_taken, count_steps =fringe.get()
+        if stats is not None:
+            clock = time.perf_counter()
+        cost_heuristic, neg_steps, node, current_state, where, components, filter_state, h, level = heappop(fringe)
+        if stats is not None:
+            stats.queue_time += time.perf_counter() - clock
+        count_steps = -neg_steps
+        if count_steps > best_steps[current_state if closed_key is None else closed_key(current_state)]:
+            continue #Stale entry, the board was reached again in fewer steps
+        if level < len(HEURISTIC_STACK):
+            h, level = evaluate_heuristic(components, where, level, h, stats=stats)
+            if cost_limit is not None and count_steps+h >= cost_limit:
+                continue
+            if weight*h+count_steps > cost_heuristic:
+                heappush(fringe, (weight*h+count_steps, neg_steps, node, current_state, where, components, filter_state, h, level))
+                continue
         steps = count_steps+1 #Increase the cost after every move
         
         if is_goal(current_state):
-            route_taken=route_taken.split(",")
-            route_taken.pop() #Remove last comma
-            return route_taken
+            return trace_route(node, parents, moves_taken)
+        #Only boards with h up to the table's depth can be in it
+        if ENDGAME_TABLE is not None and cost_heuristic-count_steps <= weight*ENDGAME_TABLE.depth \
+                and endgame_lookup(current_state) is not None:
+            return trace_route(node, parents, moves_taken) + endgame_route(current_state)
+        if budget is not None:
+            budget.spend()
+        if stats is not None:
+            stats.expanded(current_state, count_steps, cost_heuristic, len(fringe), len(best_steps))
         
-        for state_move in successors(current_state):
-            next_state, moves =  state_move[0], state_move[1]
-            if next_state not in already_visited:
-                already_visited.append(next_state)
-                fringe.put((heuristic_used(next_state)+steps,next_state, route_taken+moves+",", steps))
+        #Looking the parent's tile positions up in a move's destination list gives the child's
+        positions_after = itemgetter(*where)
+        #Children with h above this have f above the current one, their heuristic can wait
+        limit = (cost_heuristic-steps)/weight
+        next_filter_states = SHORTEST_PATH_MOVE_FILTER.next_state[filter_state]
+        for move in SHORTEST_PATH_MOVE_FILTER.allowed[filter_state]:
+            if stats is not None:
+                clock = time.perf_counter()
+            next_state = MOVE_GETTERS[move](current_state)
+            next_key = next_state if closed_key is None else closed_key(next_state)
+            if stats is not None:
+                stats.nodes_generated += 1
+                stats.successor_time += time.perf_counter() - clock
+            if steps < best_steps.get(next_key, steps+1):
+                best_steps[next_key] = steps
+                if stats is not None:
+                    clock = time.perf_counter()
+                next_where = positions_after(MOVE_DESTINATION_LISTS[move])
+                next_components = update_heuristic_components(components, where, next_where)
+                h, level = evaluate_heuristic(next_components, next_where, limit=limit, stats=stats)
+                if ENDGAME_TABLE is not None and h <= ENDGAME_TABLE.depth:
+                    endgame = endgame_lookup(next_state)
+                    if endgame is None:
+                        h = ENDGAME_TABLE.depth+1
+                    else:
+                        h, level = endgame[0], len(HEURISTIC_STACK)
+                if stats is not None:
+                    stats.heuristic_time += time.perf_counter() - clock
+                if cost_limit is not None and steps+h >= cost_limit:
+                    continue
+                if stats is not None:
+                    clock = time.perf_counter()
+                heappush(fringe, (weight*h+steps, -steps, len(parents), next_state,
+                                  next_where, next_components, next_filter_states[move], h, level))
+                if stats is not None:
+                    stats.queue_time += time.perf_counter() - clock
+                parents.append(node)
+                moves_taken.append(move)
+            elif stats is not None:
+                stats.duplicates_pruned += 1
     return [] #In case no steps needed/fringe empty
 
+def trace_route(node, parents, moves_taken):
+    """Follow the arena's parent indices back to the start board and name the moves in order"""
+    route_taken = []
+    while parents[node] != -1:
+        route_taken.append(MOVE_NAMES[moves_taken[node]])
+        node = parents[node]
+    route_taken.reverse()
+    return route_taken
+
+def greedy_key(where):
+    """
+    How far a board looks from the goal to greedy_search: the pattern database lookups added
+    up, then the squared wrap-around distances of all tiles, which puts the far tiles first.
+    Neither is a bound, but both fall steadily as tiles are placed, where the admissible
+    stack is flat over wide plateaus.
+    """
+    lookups = sum([table[pattern_index(where, tiles, cell_map)] for tiles, cell_map, table in PATTERN_DATABASES])
+    spread = sum([(vertical[cell]+horizontal[cell])**2
+                  for vertical, horizontal, cell in zip(VERTICAL_DISTANCES, HORIZONTAL_DISTANCES, where)])
+    return lookups, spread
+
+def greedy_search(original_board, budget=None, stats=None):
+    """
+    Greedy best-first search on greedy_key: always expands the board that looks closest to
+    the goal, however far it is from the start. Finds a route (usually a long one) after a
+    few hundred expansions where weighted A* needs tens of thousands, which is what anytime
+    mode needs first. Every board is generated once, so the route never revisits a board.
+    """
+    if ENDGAME_TABLE is not None and endgame_lookup(original_board) is not None:
+        return endgame_route(original_board)
+    parents = [-1]
+    moves_taken = bytearray(1)
+    where = tile_positions(original_board)
+    fringe = [(greedy_key(where), 0, 0, original_board, where, 0)]
+    seen = {original_board}
+    while fringe:
+        key, steps, node, current_state, where, filter_state = heappop(fringe)
+        if is_goal(current_state):
+            return trace_route(node, parents, moves_taken)
+        if ENDGAME_TABLE is not None and endgame_lookup(current_state) is not None:
+            return trace_route(node, parents, moves_taken) + endgame_route(current_state)
+        if budget is not None:
+            budget.spend()
+        if stats is not None:
+            stats.expanded(current_state, steps, steps, len(fringe), len(seen))
+        positions_after = itemgetter(*where)
+        next_filter_states = SHORTEST_PATH_MOVE_FILTER.next_state[filter_state]
+        for move in SHORTEST_PATH_MOVE_FILTER.allowed[filter_state]:
+            next_state = MOVE_GETTERS[move](current_state)
+            if stats is not None:
+                stats.nodes_generated += 1
+            if next_state in seen:
+                if stats is not None:
+                    stats.duplicates_pruned += 1
+                continue
+            seen.add(next_state)
+            next_where = positions_after(MOVE_DESTINATION_LISTS[move])
+            heappush(fringe, (greedy_key(next_where), steps+1, len(parents), next_state, next_where, next_filter_states[move]))
+            parents.append(node)
+            moves_taken.append(move)
+    return []
+
+#Weights for the weighted A* runs of anytime_search after its greedy first route, ending with plain A*
+ANYTIME_WEIGHTS = (3, 2, 1.5, 1.25, 1.1, 1)
+
+def anytime_search(original_board, time_limit=None, weights=ANYTIME_WEIGHTS, budget=None, stats=None):
+    """
+    Restarting weighted A*: a greedy_search first, for some route as soon as possible, then
+    one weighted A* run per weight, each only looking for routes shorter than the best one so
+    far. Yields {"route", "moves", "bound"} every time the route gets shorter or its bound
+    tighter, where the route is at most bound times the optimal length, so the last result
+    yielded is the one to use once time runs out. Stops quietly when time_limit seconds (or
+    the budget) run out, or once the route is known to be optimal. A SearchStats passed as
+    stats adds up all the runs.
+    """
+    if is_goal(original_board):
+        yield {"route": [], "moves": 0, "bound": 1}
+        return
+    if budget is None:
+        budget = SearchBudget(time_limit=time_limit)
+    best_route, best_bound = None, float('inf')
+    try:
+        best_route = greedy_search(original_board, budget, stats=stats)
+        if not best_route:
+            return
+        #No route is shorter than the admissible heuristic of the start board
+        best_bound = len(best_route) / max(heuristic_used(original_board), 1)
+        yield {"route": best_route, "moves": len(best_route), "bound": best_bound}
+        for weight in weights:
+            if best_bound == 1:
+                return
+            route_taken = astar_search(original_board, budget, weight=weight, stats=stats, cost_limit=len(best_route))
+            if route_taken:
+                best_route = route_taken
+            else:
+                #Nothing shorter exists at all, whatever the weight
+                weight = 1
+            #Any route shorter than the limit is within weight of the optimum, and if there is
+            #none the limit itself is the optimum
+            if route_taken or weight < best_bound:
+                best_bound = min(best_bound, weight)
+                yield {"route": best_route, "moves": len(best_route), "bound": best_bound}
+    except SearchLimitReached:
+        return
+
+def ida_star_search(original_board, on_iteration=None, budget=None):
+    """
+    Iterative-deepening A*: depth-first passes bounded by an f threshold that grows to the
+    smallest f that was cut off in the previous pass. Only the current path is kept, so
+    memory grows with the solution depth instead of the number of boards generated.
+    on_iteration(threshold, nodes_expanded) is called after every pass.
+    """
+    route_taken = []
+    on_path = {original_board}
+    nodes_expanded = 0
+
+    def search(current_state, where, components, filter_state, steps, threshold):
+        nonlocal nodes_expanded
+        if is_goal(current_state):
+            return True, steps
+        nodes_expanded += 1
+        if budget is not None:
+            budget.spend()
+        positions_after = itemgetter(*where)
+        children = []
+        for move in MOVE_FILTER.allowed[filter_state]:
+            next_where = positions_after(MOVE_DESTINATION_LISTS[move])
+            next_components = update_heuristic_components(components, where, next_where)
+            #Bounds past the threshold would only cut the child off harder, so stop there
+            h = evaluate_heuristic(next_components, next_where, limit=threshold-steps-1)[0]
+            children.append((h, move, MOVE_GETTERS[move](current_state), next_where, next_components))
+        #Move ordering: try the children that look closest to the goal first
+        children.sort()
+        next_threshold = float('inf')
+        for h, move, next_state, next_where, next_components in children:
+            if steps+1+h > threshold:
+                #Children are sorted by h, so every remaining one is cut off as well
+                return False, min(next_threshold, steps+1+h)
+            if next_state in on_path:
+                continue
+            on_path.add(next_state)
+            route_taken.append(MOVE_NAMES[move])
+            found, cutoff = search(next_state, next_where, next_components, MOVE_FILTER.next_state[filter_state][move], steps+1, threshold)
+            if found:
+                return True, cutoff
+            route_taken.pop()
+            on_path.discard(next_state)
+            next_threshold = min(next_threshold, cutoff)
+        return False, next_threshold
+
+    where = tile_positions(original_board)
+    components = heuristic_components(where)
+    threshold = combine_heuristic(components, where)
+    while threshold != float('inf'):
+        nodes_expanded = 0
+        found, cutoff = search(original_board, where, components, 0, 0, threshold)
+        if on_iteration is not None:
+            on_iteration(threshold, nodes_expanded)
+        if found:
+            return route_taken
+        threshold = cutoff
+    return [] #Fringe exhausted
+
+def bidirectional_search(original_board, budget=None, symmetry=False):
+    """
+    Meet-in-the-middle breadth-first search from both the start board and the goal. Moves
+    cost 1 and each has an inverse, so growing the smaller side one full layer at a time
+    and stopping at the first board both sides have reached gives an optimal route while
+    exploring about 2*b^(d/2) boards instead of b^d, b being the number of moves (24 on
+    5x5). With symmetry both sides are keyed by canonical_board, and the sides may meet at
+    two symmetric boards.
+    """
+    if is_goal(original_board):
+        return []
+    closed_key = canonical_board if symmetry else None
+    #Both maps send a board's key to (board, key of the board it was generated from, index of the move used)
+    forward = {original_board if closed_key is None else closed_key(original_board): (original_board, None, None)}
+    backward = {GOAL_STATE: (GOAL_STATE, None, None)}
+    #Layers hold (board, key, move filter state)
+    forward_layer, backward_layer = [(original_board, next(iter(forward)), 0)], [(GOAL_STATE, GOAL_STATE, 0)]
+    
+    while forward_layer and backward_layer:
+        if len(forward_layer) <= len(backward_layer):
+            layer, reached, other = forward_layer, forward, backward
+        else:
+            layer, reached, other = backward_layer, backward, forward
+        next_layer = []
+        for current_state, current_key, filter_state in layer:
+            if budget is not None:
+                budget.spend()
+            next_filter_states = SHORTEST_PATH_MOVE_FILTER.next_state[filter_state]
+            for move in SHORTEST_PATH_MOVE_FILTER.allowed[filter_state]:
+                next_state = MOVE_GETTERS[move](current_state)
+                next_key = next_state if closed_key is None else closed_key(next_state)
+                if next_key in reached:
+                    continue
+                reached[next_key] = (next_state, current_key, move)
+                if next_key in other:
+                    return _join_routes(next_key, forward, backward)
+                next_layer.append((next_state, next_key, next_filter_states[move]))
+        if reached is forward:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+    return [] #Fringe exhausted
+
+def _join_routes(meeting_key, forward, backward):
+    route_taken = []
+    key = meeting_key
+    while forward[key][1] is not None:
+        _, key, move = forward[key]
+        route_taken.append(MOVE_NAMES[move])
+    route_taken.reverse()
+    
+    #The backward half was generated from the goal, so undo its moves in reverse order
+    backward_moves = []
+    key = meeting_key
+    while backward[key][1] is not None:
+        _, key, move = backward[key]
+        backward_moves.append(INVERSE_MOVES[move])
+    #The sides may have met at symmetric boards: if symmetry takes the forward board to the
+    #backward one, move m from the backward board matches move_map.index(m) from the forward one
+    forward_board, backward_board = forward[meeting_key][0], backward[meeting_key][0]
+    symmetry = next(symmetry for symmetry in SYMMETRIES if transform_board(forward_board, symmetry) == backward_board)
+    route_taken += [MOVE_NAMES[symmetry.move_map.index(move)] for move in backward_moves]
+    return route_taken
+
+# Hash-distributed A* (HDA*): every board has an owner process, hash(board) % workers, that
+# keeps it in its own fringe and closed set. Children are sent to their owners in batches.
+# Hashes of tuples of ints are the same in every process, so owners agree without talking.
+HDA_BATCH_SIZE = 64
+
+def _hda_worker(worker_id, inboxes, results):
+    """
+    One HDA* process. Messages on its inbox are ("nodes", [(f, g, board, route, filter state)]),
+    ("incumbent", cost of the best route found so far), ("probe", round) and ("stop",).
+    Routes travel with the boards as bytes of move codes, since their parents live elsewhere.
+    """
+    inbox = inboxes[worker_id]
+    workers = len(inboxes)
+    fringe = []
+    tie = count()
+    best_steps = {}
+    outboxes = [[] for _ in range(workers)]
+    incumbent = float('inf')
+    sent = received = expanded = 0
+
+    def add(entry):
+        f, steps, board, route, filter_state = entry
+        if steps < best_steps.get(board, steps+1):
+            best_steps[board] = steps
+            heappush(fringe, (f, -steps, next(tie), board, route, filter_state))
+
+    def send(owner):
+        nonlocal sent
+        inboxes[owner].put(("nodes", outboxes[owner]))
+        outboxes[owner] = []
+        sent += 1
+
+    def flush():
+        for owner in range(workers):
+            if outboxes[owner]:
+                send(owner)
+
+    def is_idle():
+        #Nothing left that could beat the best route found so far
+        return not fringe or fringe[0][0] >= incumbent
+
+    def handle(message):
+        nonlocal received, incumbent
+        if message[0] == "nodes":
+            received += 1
+            for entry in message[1]:
+                add(entry)
+        elif message[0] == "incumbent":
+            incumbent = min(incumbent, message[1])
+        elif message[0] == "probe":
+            #Children still waiting in an outbox are work nobody has counted as sent yet
+            flush()
+            results.put(("status", worker_id, message[1], is_idle(), sent, received, expanded))
+        return message[0] != "stop"
+
+    running = True
+    while running:
+        if is_idle():
+            flush()
+            running = handle(inbox.get())
+            continue
+        
+        for _ in range(HDA_BATCH_SIZE):
+            if is_idle():
+                break
+            cost_heuristic, neg_steps, _, current_state, route_taken, filter_state = heappop(fringe)
+            steps = -neg_steps
+            if steps > best_steps[current_state]:
+                continue #Stale entry
+            if is_goal(current_state):
+                incumbent = steps
+                results.put(("solution", steps, route_taken))
+                continue
+            expanded += 1
+            where = tile_positions(current_state)
+            components = heuristic_components(where)
+            positions_after = itemgetter(*where)
+            next_filter_states = SHORTEST_PATH_MOVE_FILTER.next_state[filter_state]
+            for move in SHORTEST_PATH_MOVE_FILTER.allowed[filter_state]:
+                next_state = MOVE_GETTERS[move](current_state)
+                next_where = positions_after(MOVE_DESTINATION_LISTS[move])
+                f = combine_heuristic(update_heuristic_components(components, where, next_where), next_where) + steps+1
+                if f >= incumbent:
+                    continue
+                entry = (f, steps+1, next_state, route_taken+bytes((move,)), next_filter_states[move])
+                owner = hash(next_state) % workers
+                if owner == worker_id:
+                    add(entry)
+                else:
+                    outboxes[owner].append(entry)
+                    if len(outboxes[owner]) >= HDA_BATCH_SIZE:
+                        send(owner)
+        
+        #Pick up children and probes from the other workers between batches
+        while running:
+            try:
+                message = inbox.get_nowait()
+            except queue.Empty:
+                break
+            running = handle(message)
+
+def parallel_astar_search(original_board, workers=None, budget=None, report=None):
+    """
+    HDA* across worker processes (one per CPU by default). The first route found is not
+    necessarily optimal, so the search only stops once every worker is out of boards with
+    f below the best route's cost and no batch of children is still in transit. That is
+    detected with probe rounds (four-counter method): two consecutive rounds in which
+    every worker is idle, nobody's message counters changed, and every batch sent has been
+    received. When report is a dict, it is filled with the worker count, nodes expanded
+    and wall time.
+    """
+    start = time.monotonic()
+    if is_goal(original_board):
+        return []
+    workers = workers or os.cpu_count()
+    context = fork_context()
+    inboxes = [context.Queue() for _ in range(workers)]
+    results = context.Queue()
+    processes = [context.Process(target=_hda_worker, args=(worker_id, inboxes, results), daemon=True)
+                 for worker_id in range(workers)]
+    for process in processes:
+        process.start()
+    
+    inboxes[hash(original_board) % workers].put(("nodes", [(heuristic_used(original_board), 0, original_board, b"", 0)]))
+    best_cost, best_route = float('inf'), None
+    previous_counters = None
+    nodes_expanded = 0
+    try:
+        for probe in count(1):
+            for inbox in inboxes:
+                inbox.put(("probe", probe))
+            statuses = {}
+            while len(statuses) < workers:
+                message = results.get()
+                if message[0] == "solution" and message[1] < best_cost:
+                    best_cost, best_route = message[1], message[2]
+                    for inbox in inboxes:
+                        inbox.put(("incumbent", best_cost))
+                elif message[0] == "status" and message[2] == probe:
+                    statuses[message[1]] = message[3:]
+            
+            idle = all(status[0] for status in statuses.values())
+            counters = [status[1:3] for _, status in sorted(statuses.items())]
+            nodes_expanded = sum(status[3] for status in statuses.values())
+            #The start board was sent by us, so one more batch was sent than the workers report
+            in_transit = 1 + sum(sent for sent, _ in counters) - sum(received for _, received in counters)
+            if idle and in_transit == 0 and counters == previous_counters:
+                #The search is over, so the final count is recorded without checking the limits
+                if budget is not None:
+                    budget.nodes_expanded = nodes_expanded
+                break
+            previous_counters = counters if idle else None
+            if budget is not None:
+                budget.update(nodes_expanded)
+            if not idle:
+                time.sleep(0.005)
+    finally:
+        for inbox in inboxes:
+            inbox.put(("stop",))
+        for process in processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+    
+    if report is not None:
+        report.update({"workers": workers, "nodes_expanded": nodes_expanded, "wall_time": time.monotonic() - start})
+    if best_route is None:
+        return [] #Fringe exhausted
+    return [MOVE_NAMES[move] for move in best_route]
+
+def parallel_speedup(initial_board, workers=None):
+    """Solve the board with the serial A* and with HDA*, and compare their wall times"""
+    start = time.monotonic()
+    serial_route = astar_search(tuple(initial_board))
+    serial_time = time.monotonic() - start
+    report = {}
+    parallel_route = parallel_astar_search(tuple(initial_board), workers, report=report)
+    return {"workers": report.get("workers", workers), "serial_moves": len(serial_route), "parallel_moves": len(parallel_route),
+            "serial_time": serial_time, "parallel_time": report.get("wall_time", 0.0),
+            "speedup": serial_time / report["wall_time"] if report.get("wall_time") else None}
+
+SEARCH_METHODS = {"astar": astar_search, "ida": ida_star_search, "bidirectional": bidirectional_search,
+                  "hda": parallel_astar_search, "anytime": anytime_search}
+
+# Solved boards are kept in a sqlite file next to the pattern databases, mapping a packed
+# board to the moves that solve it. Every board along a route found is stored with the
+# rest of the route, so a later query that starts anywhere on it is answered from the file.
+# Only routes from the optimal searches are stored, so a route found by one of them answers
+# all of them, and a board keeps the shortest route stored for it.
+CACHE_FILENAME = "solved.sqlite"
+CACHE_MAX_ENTRIES = 1000000
+CACHED_METHODS = {"astar", "ida", "bidirectional", "hda"}
+
+class SolutionCache:
+    """Solved boards on disk, keeping at most max_entries and dropping the least recently used first"""
+    def __init__(self, path=None, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path or os.path.join(PDB_DIRECTORY, CACHE_FILENAME)
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        #Caches written before routes were shared between the optimal methods kept them per method
+        self.connection.execute("DROP TABLE IF EXISTS routes")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS boards (board BLOB PRIMARY KEY, moves TEXT, length INTEGER, last_used REAL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS boards_last_used ON boards (last_used)")
+        #The number of boards, kept by triggers so put need not count the table. The triggers go
+        #in before the count is taken, and the count is taken only once, in the statement storing it
+        self.connection.execute("CREATE TABLE IF NOT EXISTS board_count (id INTEGER PRIMARY KEY CHECK (id = 0), count INTEGER)")
+        self.connection.execute("CREATE TRIGGER IF NOT EXISTS boards_added AFTER INSERT ON boards "
+                                "BEGIN UPDATE board_count SET count = count + 1; END")
+        self.connection.execute("CREATE TRIGGER IF NOT EXISTS boards_dropped AFTER DELETE ON boards "
+                                "BEGIN UPDATE board_count SET count = count - 1; END")
+        self.connection.execute("INSERT OR IGNORE INTO board_count SELECT 0, COUNT(*) FROM boards")
+        self.connection.commit()
+
+    def get(self, board):
+        """The cached route for a board, or None"""
+        key = pack_board(board)
+        row = self.connection.execute("SELECT moves FROM boards WHERE board = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with self.connection:
+            self.connection.execute("UPDATE boards SET last_used = ? WHERE board = ?", (time.time(), key))
+        return row[0].split()
+
+    def put(self, board, route_taken):
+        """Store the route for the board and, for every board along it, the rest of the route, unless a shorter one is stored"""
+        rows = []
+        now = time.time()
+        for step in range(len(route_taken)):
+            rows.append((pack_board(board), " ".join(route_taken[step:]), len(route_taken)-step, now))
+            board = MOVE_GETTERS[MOVE_NAMES.index(route_taken[step])](board)
+        with self.connection:
+            self.connection.executemany("INSERT INTO boards VALUES (?, ?, ?, ?) ON CONFLICT (board) DO UPDATE SET "
+                                        "moves = CASE WHEN excluded.length < length THEN excluded.moves ELSE moves END, "
+                                        "length = MIN(length, excluded.length), last_used = excluded.last_used", rows)
+            excess = self.connection.execute("SELECT count FROM board_count").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.connection.execute("DELETE FROM boards WHERE rowid IN "
+                                        "(SELECT rowid FROM boards ORDER BY last_used LIMIT ?)", (excess,))
+
+_default_caches = {}
+
+def default_cache():
+    """The SolutionCache for the current board shape, opened once per process"""
+    key = (os.getpid(), PDB_DIRECTORY)
+    if key not in _default_caches:
+        _default_caches[key] = SolutionCache()
+    return _default_caches[key]
+
+def solve(initial_board, method="astar", cache=False, **options):
+    """
+    Solve the board with one of SEARCH_METHODS. Extra options go to the search function,
+    e.g. budget=SearchBudget(max_nodes, time_limit) to give up with SearchLimitReached.
+    method="anytime" returns a generator of ever shorter routes instead, see anytime_search.
+    The astar and anytime methods also take stats=SearchStats() for counters and timings.
+    With cache=True (the default SolutionCache for the board shape) or a SolutionCache,
+    routes of the optimal methods are looked up in and saved to the solved-board cache;
+    by default every board is searched.
+    """
+    if method not in SEARCH_METHODS:
+        raise(Exception("Error: unknown search method " + str(method)))
+    initial_board = tuple(initial_board)
+    #A weight or cost limit makes A* give up optimality, so those routes are not cached
+    if not cache or method not in CACHED_METHODS or options.get("weight", 1) != 1 or options.get("cost_limit") is not None:
+        return SEARCH_METHODS[method](initial_board, **options)
+    if cache is True:
+        cache = default_cache()
+    route_taken = cache.get(initial_board)
+    if route_taken is None:
+        route_taken = SEARCH_METHODS[method](initial_board, **options)
+        cache.put(initial_board, route_taken)
+    return route_taken
+
 #Please don't modify anything below this line
 
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+# !/usr/bin/env python3
+# test_endgame2021.py : Checks for the breadth-first endgame table
+#
+# Code by: Harsh K Atha (hatha), Aashay Gondalia (aagond)
+#
+# A depth 2 table is built into a temporary directory, so the table in part1/pdb is not touched.
+
+import solver2021
+import bench2021
+import endgame2021
+import numpy as np
+import pytest
+from test_solver_modes import apply_route
+
+
+@pytest.mark.timeout(300)
+def test_endgame_table_round_trip(tmp_path, monkeypatch):
+    endgame2021.build_endgame_table(2, str(tmp_path))
+    table = solver2021.load_endgame_table(str(tmp_path))
+    assert table.depth == 2
+    monkeypatch.setattr(solver2021, "ENDGAME_TABLE", table)
+
+    assert solver2021.endgame_lookup(solver2021.GOAL_STATE)[0] == 0
+    for name, depth, board in bench2021.scrambled_boards([1, 2], 3, seed=2021):
+        distance, _ = solver2021.endgame_lookup(board)
+        route_taken = solver2021.endgame_route(board)
+        assert distance == len(route_taken) == len(solver2021.bidirectional_search(board)), name
+        assert solver2021.is_goal(apply_route(board, route_taken)), name
+    #Three moves from the goal is past a depth 2 table
+    far = bench2021.scrambled_boards([3], 1, seed=2021)[0][2]
+    if len(solver2021.bidirectional_search(far)) == 3:
+        assert solver2021.endgame_lookup(far) is None
+
+
+def test_short_endgame_table_is_refused(tmp_path):
+    path = endgame2021.build_endgame_table(2, str(tmp_path))
+    assert sorted(name for name in tmp_path.iterdir() if name.is_dir()) == []
+    #Cut to a third of its boards, with the key and info files still matching each other
+    keys, info = endgame2021.read_run(path)
+    third = len(keys) // 3
+    endgame2021.write_run(path, np.array(keys[:third]), np.array(info[:third]))
+    with pytest.raises(Exception, match="damaged or incomplete"):
+        solver2021.load_endgame_table(str(tmp_path))
+
+
+def test_endgame_route_needs_every_board(tmp_path, monkeypatch):
+    endgame2021.build_endgame_table(2, str(tmp_path))
+    monkeypatch.setattr(solver2021, "ENDGAME_TABLE", solver2021.load_endgame_table(str(tmp_path)))
+    board = bench2021.scrambled_boards([2], 1, seed=2021)[0][2]
+    lookup = solver2021.endgame_lookup
+    #The table reached board but lost the board one move from the goal
+    monkeypatch.setattr(solver2021, "endgame_lookup", lambda next_board: lookup(next_board) if next_board == board else None)
+    with pytest.raises(Exception, match="no way home"):
+        solver2021.endgame_route(board)
@@ -0,0 +1,60 @@
+# !/usr/bin/env python3
+# test_solution_cache.py : Checks for the persistent solved-board cache
+#
+# Code by: Harsh K Atha (hatha), Aashay Gondalia (aagond)
+
+import solver2021
+import bench2021
+from test_solver_modes import BOARDS, apply_route
+
+
+def test_cache_round_trip(tmp_path):
+    cache = solver2021.SolutionCache(str(tmp_path / "solved.sqlite"))
+    name, depth, board = BOARDS[0]
+    assert cache.get(board) is None
+
+    route_taken = solver2021.solve(board, "astar", cache=cache)
+    assert cache.get(board) == route_taken
+    #Every board along the route keeps the rest of it
+    assert cache.get(apply_route(board, route_taken[:1])) == route_taken[1:]
+    #A route from any of the optimal methods answers all of them
+    assert solver2021.solve(board, "ida", cache=cache, budget=solver2021.SearchBudget(max_nodes=0)) == route_taken
+
+    #A longer route does not replace a shorter one, a shorter one does
+    detour = route_taken[:1] + [solver2021.MOVE_NAMES[solver2021.INVERSE_MOVES[solver2021.MOVE_NAMES.index(route_taken[0])]]]
+    cache.put(board, detour + route_taken)
+    assert cache.get(board) == route_taken
+    other = BOARDS[1][2]
+    cache.put(other, detour + solver2021.bidirectional_search(other))
+    cache.put(other, solver2021.bidirectional_search(other))
+    assert cache.get(other) == solver2021.bidirectional_search(other)
+
+    #A cached board is answered without searching
+    far = BOARDS[-1][2]
+    cache.put(far, ["L1"])
+    assert solver2021.solve(far, "bidirectional", cache=cache) == ["L1"]
+
+
+def test_cache_drops_least_recently_used(tmp_path):
+    cache = solver2021.SolutionCache(str(tmp_path / "solved.sqlite"), max_entries=2)
+    boards = [board for name, depth, board in bench2021.scrambled_boards([1], 3, seed=2021)]
+    assert len(set(boards)) == 3
+    for board in boards:
+        cache.put(board, solver2021.bidirectional_search(board))
+    assert cache.get(boards[0]) is None
+    assert cache.get(boards[1]) is not None and cache.get(boards[2]) is not None
+
+
+def test_cache_counts_boards_without_scanning(tmp_path):
+    path = str(tmp_path / "solved.sqlite")
+    cache = solver2021.SolutionCache(path, max_entries=100)
+    for name, depth, board in BOARDS:
+        cache.put(board, solver2021.bidirectional_search(board))
+    #Boards stored again are not counted twice, and a cache opened later picks the count up
+    cache.put(BOARDS[0][2], solver2021.bidirectional_search(BOARDS[0][2]))
+    stored = cache.connection.execute("SELECT COUNT(*) FROM boards").fetchone()[0]
+    assert cache.connection.execute("SELECT count FROM board_count").fetchone()[0] == stored
+    reopened = solver2021.SolutionCache(path, max_entries=stored-1)
+    reopened.put(BOARDS[0][2], solver2021.bidirectional_search(BOARDS[0][2]))
+    assert reopened.connection.execute("SELECT COUNT(*) FROM boards").fetchone()[0] == stored-1
+    assert reopened.connection.execute("SELECT count FROM board_count").fetchone()[0] == stored-1
@@ -0,0 +1,90 @@
+# !/usr/bin/env python3
+# test_solver_modes.py : Checks for the search methods, search budgets and benchmark
+#
+# Code by: Harsh K Atha (hatha), Aashay Gondalia (aagond)
+#
+# Scrambles come from bench2021.scrambled_boards with a fixed seed, so every run checks
+# the same boards. The bidirectional search is optimal and finds these fastest, so every
+# other method's route is held to its length.
+
+import solver2021
+import bench2021
+import pytest
+
+BOARDS = bench2021.scrambled_boards([3, 5, 7], 2, seed=2021)
+
+
+def apply_route(board, route_taken):
+    '''
+    Play a route on a board.
+
+    ARGS    : board[TUPLE], route_taken[LIST] of move names
+    RETURNS : board[TUPLE]
+    '''
+    for move in route_taken:
+        board = solver2021.MOVE_GETTERS[solver2021.MOVE_NAMES.index(move)](board)
+    return board
+
+
+def search(method, board):
+    if method == "anytime":
+        #The last result is the best route found, and it is optimal once its bound reaches 1
+        result = list(solver2021.solve(board, method))[-1]
+        assert result["bound"] == 1
+        return result["route"]
+    if method == "hda":
+        return solver2021.solve(board, method, workers=2)
+    return solver2021.solve(board, method)
+
+
+@pytest.mark.timeout(300)
+@pytest.mark.parametrize("method", sorted(solver2021.SEARCH_METHODS))
+def test_methods_match_bidirectional(method):
+    for name, depth, board in BOARDS:
+        optimal = solver2021.bidirectional_search(board)
+        assert len(optimal) <= depth, name + ": bidirectional route longer than the scramble"
+        route_taken = search(method, board)
+        assert solver2021.is_goal(apply_route(board, route_taken)), name + ": route does not solve the board"
+        assert len(route_taken) == len(optimal), name + ": route is not the shortest"
+
+
+def test_goal_needs_no_moves():
+    for method in sorted(solver2021.SEARCH_METHODS):
+        assert search(method, solver2021.GOAL_STATE) == []
+
+
+def test_baseline_checks():
+    baseline = {"seed": 2021, "method": "hda", "size": "5x5", "rings": 2,
+                "results": [{"board": "d5-0", "status": "solved", "length": 5, "optimal": True,
+                             "nodes_expanded": 345, "nodes_per_second": None}]}
+    settings = {"seed": 2021, "method": "hda", "size": "5x5", "rings": 2}
+    assert bench2021.baseline_mismatches(baseline, settings) == []
+    assert bench2021.baseline_mismatches(baseline, dict(settings, size="4x4")) == ["size is 4x4, baseline has 5x5"]
+
+    #HDA* expands a different number of boards every run
+    result = dict(baseline["results"][0], nodes_expanded=391, optimal_length=5)
+    assert bench2021.compare_to_baseline([result], baseline) == []
+    baseline["method"] = "astar"
+    assert bench2021.compare_to_baseline([result], baseline) == ["d5-0: 391 nodes expanded, was 345"]
+
+
+@pytest.fixture
+def without_tables(monkeypatch):
+    '''Search with the built-in bounds only, whatever pattern databases and endgame table are on disk'''
+    monkeypatch.setattr(solver2021, "PATTERN_DATABASES", [])
+    monkeypatch.setattr(solver2021, "ENDGAME_TABLE", None)
+
+
+@pytest.mark.parametrize("method", ["astar", "ida", "bidirectional"])
+def test_node_limit_counts_expanded_boards(method, without_tables):
+    #With the tables built, A* and IDA* solve this board in fewer than 10 expansions
+    budget = solver2021.SearchBudget(max_nodes=10)
+    with pytest.raises(solver2021.SearchLimitReached):
+        solver2021.solve(BOARDS[-1][2], method, budget=budget)
+    assert budget.nodes_expanded == 10
+
+
+def test_hda_budget_gets_final_count():
+    budget, report = solver2021.SearchBudget(), {}
+    solver2021.parallel_astar_search(BOARDS[-1][2], workers=2, budget=budget, report=report)
+    assert budget.nodes_expanded == report["nodes_expanded"] > 0
@@ -8,27 +8,52 @@
 
 
 # !/usr/bin/env python3
+import os
 import sys
-from queue import PriorityQueue
+import math
+import mmap
+import struct
+import heapq
+import hashlib
+import tempfile
+from array import array
+from collections import namedtuple
 import numpy as np
-import pandas as pd
 
+# The road network in compressed sparse rows: names[LIST] and ids[DICT] map node ids to city names and back, the
+# segments leaving node n are offsets[n] to offsets[n+1] of targets, distances, speeds and highways (ids into
+# highway_names[LIST]), and latitudes/longitudes hold each node's coordinates
+RoadGraph = namedtuple("RoadGraph", ["names", "ids", "offsets", "targets", "distances", "speeds", "highways",
+                                     "highway_names", "latitudes", "longitudes", "max_speed", "avg_distance"])
 
-def read_datasets():
+SOURCE_FILES = ('road-segments.txt', 'city-gps.txt')
+GRAPH_FILE = 'road-graph.bin'
+GRAPH_MAGIC = b'ROADGRF1'
+# magic, node count, segment count (both directions), highway count, name table and highway table sizes in bytes,
+# max_speed, avg_distance, then (mtime_ns, size, sha256) of each source file. The file is a local cache, so it is
+# written in the machine's own byte order
+GRAPH_COUNTS = struct.Struct('=8s5I4x2d')
+GRAPH_STAMP = struct.Struct('=' + 'qq32s' * len(SOURCE_FILES))
+GRAPH_HEADER = struct.Struct(GRAPH_COUNTS.format + GRAPH_STAMP.format[1:])
+
+
+def read_datasets(directory='.'):
     '''
     The read_dataset function makes use of the pandas library to 
     get the 'road-segments.txt' and 'city-gps.txt' datasets in to the dataframe object.
     Usage of these libraries is to foster the development process and quick querying. 
     Additionally, numpy is used instead of the math package in the get_haversine_distance function. 
 
-    ARGS : [None]
+    ARGS : directory[STRING] holding the datasets
     RETURNS : segments_df[pd.DataFrame], coordinate_df[pd.DataFrame], max_speed[FLOAT]
 
     '''
-    segment_df = pd.read_csv('road-segments.txt', sep=' ',
+    # Only needed when the graph file is rebuilt, so it is not imported with the module
+    import pandas as pd
+    segment_df = pd.read_csv(os.path.join(directory, 'road-segments.txt'), sep=' ',
                              names=['start', 'destination', 'distance', 'speed', 'highway_name'])
     coordinate_df = pd.read_csv(
-        'city-gps.txt', sep=' ', names=['city', 'latitude', 'longitude'])
+        os.path.join(directory, 'city-gps.txt'), sep=' ', names=['city', 'latitude', 'longitude'])
     max_speed = segment_df['speed'].max()
     avg_distance =  0.25 * segment_df['distance'].max() +  0.75 * segment_df['distance'].mean()
     return segment_df, coordinate_df, max_speed, avg_distance
@@ -100,90 +125,292 @@ def calculate_cost(cost_function, city, to_distance, avg_distance, to_speed, max
     return cost, total_distance, total_time, total_delivery_time
 
 
-def estimate_coordinates(city_name, carried_latitude, carried_longitude, segment_dataset, coordinate_dataset):
+def build_graph(segment_dataset, coordinate_dataset, max_speed, avg_distance):
+    '''
+    The build_graph function loads the road network once into adjacency arrays indexed by integer ids,
+    so the search never scans the datasets again. Every city or highway junction in either file gets an id,
+    and every segment is listed under both of its ends (the roads are two-way) in file order.
+    Coordinates are kept in arrays indexed by the same ids; the junctions missing from city-gps.txt are estimated here.
+
+    ARGS    : segment_dataset[pd.DataFrame], coordinate_dataset[pd.DataFrame], max_speed[FLOAT], avg_distance[FLOAT]
+    RETURNS : graph[RoadGraph]
+    '''
+    names = list(dict.fromkeys(list(coordinate_dataset['city']) + list(segment_dataset['start']) + list(segment_dataset['destination'])))
+    ids = {name: node for node, name in enumerate(names)}
+    latitudes = array('d', [math.nan]) * len(names)
+    longitudes = array('d', [math.nan]) * len(names)
+    for city, latitude, longitude in coordinate_dataset.itertuples(index=False):
+        if math.isnan(latitudes[ids[city]]):
+            latitudes[ids[city]], longitudes[ids[city]] = latitude, longitude
+    highway_names = list(dict.fromkeys(str(highway_name) for highway_name in segment_dataset['highway_name']))
+    highway_ids = {highway_name: highway for highway, highway_name in enumerate(highway_names)}
+    edges = [[] for _ in names]
+    for start, destination, distance, speed, highway_name in segment_dataset.itertuples(index=False):
+        highway = highway_ids[str(highway_name)]
+        edges[ids[start]].append((ids[destination], distance, speed, highway))
+        if start != destination:
+            edges[ids[destination]].append((ids[start], distance, speed, highway))
+
+    offsets, targets, highways = array('i', [0]), array('i'), array('i')
+    distances, speeds = array('d'), array('d')
+    for node_edges in edges:
+        for next_node, distance, speed, highway in node_edges:
+            targets.append(next_node)
+            distances.append(distance)
+            speeds.append(speed)
+            highways.append(highway)
+        offsets.append(len(targets))
+    graph = RoadGraph(names, ids, offsets, targets, distances, speeds, highways, highway_names,
+                      latitudes, longitudes, float(max_speed), float(avg_distance))
+    estimate_missing_coordinates(graph)
+    return graph
+
+
+def segments(graph, node):
+    '''
+    The segments function lists the segments leaving a node.
+
+    ARGS    : graph[RoadGraph], node[INT]
+    RETURNS : iterator of (next_node[INT], distance[FLOAT], speed[FLOAT], highway[INT])
+    '''
+    start, end = graph.offsets[node], graph.offsets[node+1]
+    return zip(graph.targets[start:end], graph.distances[start:end], graph.speeds[start:end], graph.highways[start:end])
+
+
+def source_stamp(directory='.'):
+    '''
+    The source_stamp function identifies the current datasets by modification time, size and SHA-256.
+
+    ARGS    : directory[STRING] holding the datasets
+    RETURNS : stamp[LIST] of (mtime_ns[INT], size[INT], sha256[BYTES]), one per source file
+    '''
+    stamp = []
+    for name in SOURCE_FILES:
+        path = os.path.join(directory, name)
+        with open(path, 'rb') as file:
+            digest = hashlib.sha256(file.read()).digest()
+        status = os.stat(path)
+        stamp.append((status.st_mtime_ns, status.st_size, digest))
+    return stamp
+
+
+def current_stamp(stamp, directory='.'):
+    '''
+    The current_stamp function checks a graph file's stamp against the datasets. A file whose modification time
+    and size are unchanged is taken as is; otherwise it is hashed, so touching a file does not force a rebuild.
+
+    ARGS    : stamp[LIST] as returned by source_stamp, directory[STRING] holding the datasets
+    RETURNS : stamp[LIST] with the datasets' current modification times and sizes, or None when a dataset changed
+    '''
+    current = []
+    for name, (mtime_ns, size, digest) in zip(SOURCE_FILES, stamp):
+        path = os.path.join(directory, name)
+        status = os.stat(path)
+        if (status.st_mtime_ns, status.st_size) != (mtime_ns, size):
+            with open(path, 'rb') as file:
+                if hashlib.sha256(file.read()).digest() != digest:
+                    return None
+        current.append((status.st_mtime_ns, status.st_size, digest))
+    return current
+
+
+def write_graph_stamp(path, stamp):
+    '''
+    The write_graph_stamp function rewrites the stamp in a graph file's header, once datasets that were only
+    touched have been hashed, so later queries do not hash them again.
+
+    ARGS    : path[STRING], stamp[LIST] as returned by source_stamp
+    RETURNS : [None]
+    '''
+    with open(path, 'r+b') as file:
+        file.seek(GRAPH_COUNTS.size)
+        file.write(GRAPH_STAMP.pack(*[field for source in stamp for field in source]))
+
+
+def write_graph_file(graph, path, stamp):
+    '''
+    The write_graph_file function compiles a graph into the binary file read_graph_file maps: the header, then the
+    distances, speeds, latitudes and longitudes as doubles, the offsets, targets and highways as 32-bit integers,
+    and the node and highway names, one per line. The file is written under a temporary name and then renamed,
+    so a query never reads a half-written file.
+
+    ARGS    : graph[RoadGraph], path[STRING], stamp[LIST] as returned by source_stamp
+    RETURNS : [None]
+    '''
+    name_table = '\n'.join(graph.names).encode()
+    highway_table = '\n'.join(graph.highway_names).encode()
+    header = GRAPH_HEADER.pack(GRAPH_MAGIC, len(graph.names), len(graph.targets), len(graph.highway_names),
+                               len(name_table), len(highway_table), graph.max_speed, graph.avg_distance,
+                               *[field for source in stamp for field in source])
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or '.', delete=False) as file:
+        file.write(header)
+        for values in (graph.distances, graph.speeds, graph.latitudes, graph.longitudes,
+                       graph.offsets, graph.targets, graph.highways):
+            file.write(values.tobytes())
+        file.write(name_table)
+        file.write(highway_table)
+    os.chmod(file.name, 0o644)
+    os.replace(file.name, path)
+
+
+def read_graph_file(path):
+    '''
+    The read_graph_file function memory-maps a file written by write_graph_file. The arrays are views into the
+    mapping, so only the name tables are read up front.
+
+    ARGS    : path[STRING]
+    RETURNS : graph[RoadGraph], stamp[LIST] as returned by source_stamp
+    '''
+    with open(path, 'rb') as file:
+        buffer = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+    header = GRAPH_HEADER.unpack_from(buffer)
+    magic, node_count, segment_count, highway_count, name_size, highway_size, max_speed, avg_distance = header[:8]
+    if magic != GRAPH_MAGIC:
+        raise(ValueError("Error: " + path + " is not a road graph file"))
+    stamp = [header[i:i+3] for i in range(8, len(header), 3)]
+
+    layout = (('d', segment_count), ('d', segment_count), ('d', node_count), ('d', node_count),
+              ('i', node_count+1), ('i', segment_count), ('i', segment_count))
+    if len(buffer) != GRAPH_HEADER.size + sum(count * array(typecode).itemsize for typecode, count in layout) + name_size + highway_size:
+        raise(ValueError("Error: " + path + " is truncated"))
+
+    sections = []
+    position = GRAPH_HEADER.size
+    for typecode, count in layout:
+        size = count * array(typecode).itemsize
+        sections.append(buffer[position:position+size].cast(typecode))
+        position += size
+    distances, speeds, latitudes, longitudes, offsets, targets, highways = sections
+    names = bytes(buffer[position:position+name_size]).decode().split('\n')
+    position += name_size
+    highway_names = bytes(buffer[position:position+highway_size]).decode().split('\n')
+    ids = {name: node for node, name in enumerate(names)}
+    return RoadGraph(names, ids, offsets, targets, distances, speeds, highways, highway_names,
+                     latitudes, longitudes, max_speed, avg_distance), stamp
+
+
+def load_graph(directory='.'):
+    '''
+    The load_graph function maps the compiled road graph, compiling it first from the datasets when the graph file
+    is missing or the datasets have changed since it was written. When the file cannot be written the graph is
+    built in memory for this query only.
+
+    ARGS    : directory[STRING] holding the datasets
+    RETURNS : graph[RoadGraph]
+    '''
+    path = os.path.join(directory, GRAPH_FILE)
+    try:
+        graph, stamp = read_graph_file(path)
+        current = current_stamp(stamp, directory)
+        if current is not None:
+            if current != stamp:
+                try:
+                    write_graph_stamp(path, current)
+                except OSError:
+                    # A read-only file is still current, it is only hashed again next time
+                    pass
+            return graph
+    except (OSError, ValueError, struct.error):
+        pass
+    # Stamped before reading, so datasets edited during the build make the file stale rather than wrong
+    stamp = source_stamp(directory)
+    graph = build_graph(*read_datasets(directory))
+    try:
+        write_graph_file(graph, path, stamp)
+    except OSError:
+        pass
+    return graph
+
+
+def estimate_coordinates(node, graph):
     '''
     The estimate_coordinates function estimates the coordinates of the points with no co-ordinates present in the 
     city-gps.txt. A version of triangulation -> (mean of the coordinates of the neighboring points) is used here.
     I implemented the application of weighted mean (based on distance) as well, which is a better estimate,
     but I noticed its damping effect on the overall performance
 
-    ARGS    : city_name[STRING], carried_latitude[FLOAT], carried_longitude[FLOAT], segment_dataset[pd.DataFrame], coordinate_dataset[pd.DataFrame]
+    ARGS    : node[INT], graph[RoadGraph] with the coordinates known so far
     
-    RETURNS : [estimated_latitude, estimated_longitude]  [[FLOAT, FLOAT]] 
-    '''
-    citiesA = set(segment_dataset.loc[(segment_dataset['start'] == city_name)]['destination'])
-    citiesB = set(segment_dataset.loc[(segment_dataset['destination'] == city_name)]['start'])
-    cities = list(set.union(citiesA, citiesB))
-    if city_name in cities:
-        cities.remove(city_name)
-    coord_latitude, coord_longitude = carried_latitude, carried_longitude
-    city_with_coords = 1
-    if (carried_latitude == 0) and (coord_longitude == 0):
-        city_with_coords = 0
-    for city in cities:
-        if list(np.array(coordinate_dataset[coordinate_dataset['city'] == city])):
-            coords = np.array(coordinate_dataset[coordinate_dataset['city'] == city])[0]
-            coord_latitude += coords[1]
-            coord_longitude += coords[2]
-            #print('Neighbourhood City : ', city, ' located at ', coords)
-            city_with_coords += 1
-    return [coord_latitude / city_with_coords, coord_longitude / city_with_coords]
-
-
-def find_paths(cost_function, prev_cost, prev_total_distance, prev_time, prev_delivery_time, city, path, coordinates,  end_city, segment_dataset, coordinate_dataset, max_speed, avg_distance):
+    RETURNS : [estimated_latitude, estimated_longitude]  [[FLOAT, FLOAT]], or None when no neighbour has coordinates yet
+    '''
+    neighbours = set(next_node for next_node, _, _, _ in segments(graph, node))
+    neighbours.discard(node)
+    known = [next_node for next_node in sorted(neighbours) if not math.isnan(graph.latitudes[next_node])]
+    if not known:
+        return None
+    return [sum(graph.latitudes[next_node] for next_node in known) / len(known),
+            sum(graph.longitudes[next_node] for next_node in known) / len(known)]
+
+
+def estimate_missing_coordinates(graph):
+    '''
+    The estimate_missing_coordinates function gives every junction missing from city-gps.txt estimated coordinates
+    once, when the graph is built. Junctions next to a city with coordinates are estimated first, then the junctions
+    next to those, and so on along chains of junctions. Each round only uses the coordinates known before it began,
+    so the estimates do not depend on the order of the nodes or on the route that reaches them.
+
+    ARGS    : graph[RoadGraph], whose coordinates are filled in place
+    RETURNS : rounds[INT] taken
+    '''
+    missing = [node for node in range(len(graph.names)) if math.isnan(graph.latitudes[node])]
+    rounds = 0
+    while missing:
+        estimates = {node: estimate_coordinates(node, graph) for node in missing}
+        estimates = {node: estimate for node, estimate in estimates.items() if estimate is not None}
+        if not estimates:
+            # Whatever is left is not connected to any city with coordinates
+            break
+        for node, (latitude, longitude) in estimates.items():
+            graph.latitudes[node], graph.longitudes[node] = latitude, longitude
+        missing = [node for node in missing if node not in estimates]
+        rounds += 1
+    return rounds
+
+
+def find_paths(cost_function, prev_cost, prev_total_distance, prev_time, prev_delivery_time, node, path_length, end_coordinates, graph):
     '''
     The find_paths function finds the possible path that can be added to the fringe (priority queue). 
-    It calls estimate_coordinates and calculate_cost functions to get the cost values as well 
+    It calls the calculate_cost function to get the cost values as well 
     updated distance, time, delivery time and segments(path length)
 
     ARGS         : cost_function[STRING], prev_cost[FLOAT], prev_total_distance[FLOAT], 
-    ARGS(contd.) : prev_time[FLOAT], prev_delivery_time[FLOAT], city[STRING], path[LIST], coordinates[LIST],  
-    ARGS(contd.) : end_city[STRING], segment_dataset[pd.DataFrame], coordinate_dataset[pd.DataFrame], max_speed[FLOAT]
-
-    RETURNS      : option_cities_master_list[LIST]
-    '''
-    (latitude, longitude) = coordinates
-    next_options = np.array(segment_dataset[segment_dataset['start'] == city]).tolist()
-    co_ordinates_start_city = np.array(coordinate_dataset[coordinate_dataset['city'] == city])
-    co_ordinates_end_city = np.array(coordinate_dataset[coordinate_dataset['city'] == end_city])
-    more_next_options = np.array(segment_dataset[segment_dataset['destination'] == city]).tolist()
-    for more_option_city in more_next_options:
-        placeholder = more_option_city
-        src = more_option_city[1]
-        dest = more_option_city[0]
-        placeholder[0] = src
-        placeholder[1] = dest
-        next_options.append(placeholder)
+    ARGS(contd.) : prev_time[FLOAT], prev_delivery_time[FLOAT], node[INT], path_length[INT] in nodes,  
+    ARGS(contd.) : end_coordinates[TUPLE], graph[RoadGraph]
 
+    RETURNS      : option_cities_master_list[LIST] of (cost, next_node, segment, total_distance, total_time, delivery_time),
+    RETURNS(contd.): where segment[INT] is the index of the segment taken in the graph's segment arrays
+    '''
     option_cities_master_list = []
-    for option_city in next_options:
-        n_path = path.copy()
-        next_city = option_city[1]
-        to_distance = option_city[2]
-        to_speed = option_city[3]
-        highway_name = option_city[4]
-
-        if list(np.array(coordinate_dataset[coordinate_dataset['city'] == next_city])):
-            co_ordinate = np.array(coordinate_dataset[coordinate_dataset['city'] == next_city])[0]
-            newlatitude = co_ordinate[1]
-            newlongitude = co_ordinate[2]
-        else:
-            newlatitude, newlongitude = estimate_coordinates(next_city, latitude, longitude, segment_dataset, coordinate_dataset) #Estimate Coordinates
-            # newlatitude, newlongitude = latitude, longitude # Assuming co-ordinate of the last city from the path.    #Take Coordinates of the city it came from
-
-        cost, total_distance, total_time, delivery_time = calculate_cost(cost_function, next_city, to_distance, avg_distance, to_speed, max_speed, highway_name, newlatitude,
-                                                                         newlongitude, co_ordinates_end_city[0][1], co_ordinates_end_city[0][2], prev_cost, prev_total_distance, prev_time, prev_delivery_time, len(path)+1)
-        n_path.append(next_city)
-        option_cities_master_list.append((cost, next_city, n_path, newlatitude, newlongitude, total_distance, total_time, delivery_time))  # append to list : option_cities_master_list
+    for segment, (next_node, to_distance, to_speed, highway) in enumerate(segments(graph, node), graph.offsets[node]):
+        newlatitude, newlongitude = graph.latitudes[next_node], graph.longitudes[next_node]
+        highway_name = graph.highway_names[highway]
+        cost, total_distance, total_time, delivery_time = calculate_cost(cost_function, next_node, to_distance, graph.avg_distance, to_speed, graph.max_speed, highway_name, newlatitude,
+                                                                         newlongitude, end_coordinates[0], end_coordinates[1], prev_cost, prev_total_distance, prev_time, prev_delivery_time, path_length+1)
+        option_cities_master_list.append((cost, next_node, segment, total_distance, total_time, delivery_time))  # append to list : option_cities_master_list
 
     return option_cities_master_list
 
 
-def getInformation(path, segment_dataset,):
+def trace_path(parents, node):
+    '''
+    The trace_path function follows the parent pointers back from a node to the start. Two cities can be joined by
+    more than one segment, so the pointers hold the segment taken and not just the node it came from.
+
+    ARGS    : parents[DICT] of node to (previous node, segment index) it was reached by (None for the start), node[INT]
+    RETURNS : path[LIST] of segment indices from the start to node
+    '''
+    path = []
+    while parents[node] is not None:
+        node, segment = parents[node]
+        path.append(segment)
+    return path[::-1]
+
+
+def getInformation(path, graph):
     '''
     The getInformation function returns the required information for the output.
 
-    ARGS    : path[LIST], segment_dataset[pd.DataFrame]
+    ARGS    : path[LIST] of segment indices, graph[RoadGraph]
     RETURNS : distance[FLOAT], time[FLOAT], expected_time[FLOAT], routes[LIST]
     '''
 
@@ -192,16 +419,11 @@ def getInformation(path, segment_dataset,):
     expected_time = 0
     routes = []
 
-    for i in range(len(path) - 1):
-        dist = np.array(segment_dataset.loc[(segment_dataset['start'] == path[i]) & (segment_dataset['destination'] == path[i+1]) | (
-            segment_dataset['destination'] == path[i]) & (segment_dataset['start'] == path[i+1])].distance)
-        spd = np.array(segment_dataset.loc[(segment_dataset['start'] == path[i]) & (segment_dataset['destination'] == path[i+1]) | (
-            segment_dataset['destination'] == path[i]) & (segment_dataset['start'] == path[i+1])].speed)
-        highway = np.array(segment_dataset.loc[(segment_dataset['start'] == path[i]) & (segment_dataset['destination'] == path[i+1]) | (
-            segment_dataset['destination'] == path[i]) & (segment_dataset['start'] == path[i+1])].highway_name)
+    for segment in path:
+        dist, spd, highway = graph.distances[segment], graph.speeds[segment], graph.highways[segment]
         tme = dist / spd
 
-        routes.append((path[i+1], str(highway[0]) +' for ' + str(dist[0]) + ' miles'))
+        routes.append((graph.names[graph.targets[segment]], graph.highway_names[highway] +' for %g miles' % dist))
         if spd >= 50:
             expected_tm = tme + (np.tanh(dist/1000)) * 2 * (tme + time)
         else:
@@ -211,41 +433,85 @@ def getInformation(path, segment_dataset,):
         time += tme
         expected_time += expected_tm
 
-    return distance[0], time[0], expected_time[0], routes
+    return distance, time, expected_time, routes
 
 
-def get_optimal_route(start_city, end_city, cost_function):
+def get_optimal_route(start_city, end_city, cost_function, graph=None, stats=None):
     '''
     The get_optimal_route is the runner function that manages the core logic and returns the
     output in the required format. The best path is popped from the priority queue (i.e. based on least cost.)
 
-    ARGS    : start_city[STRING], end_city[STRING], cost[FLOAT]
+    ARGS    : start_city[STRING], end_city[STRING], cost[FLOAT], graph[RoadGraph] (loaded when None),
+    ARGS(contd.) : stats[DICT] that receives the number of nodes expanded and reopened as 'nodes_expanded', 'nodes_reopened'
+    RETURNS : distance[FLOAT], time[FLOAT], expected_time[FLOAT], routes[LIST]
     '''
-    segment_dataset, coordinate_dataset, max_speed, avg_distance = read_datasets()
-    pQueue = PriorityQueue()
-    try:
-        latitude, longitude = tuple(np.array(coordinate_dataset[coordinate_dataset['city'] == start_city])[0][1:])
-    except Exception as e:
-        # Handling the condition where the start_city has no coordinates (i.e. a highway). 
-        latitude, longitude = estimate_coordinates(start_city, 0, 0, segment_dataset, coordinate_dataset)
-    
-    pQueue.put((0, (start_city, [start_city], (latitude, longitude), 0, 0, 0)))
-    already_visited = []
-    while not pQueue.empty():
-        cost, (city, path, (latitude, longitude), total_distance,total_time, total_delivery_time) = pQueue.get()
-        if city == end_city:
-            t_distance, t_time, t_d_time, routes = getInformation(path, segment_dataset)
+    if graph is None:
+        graph = load_graph()
+    for city in (start_city, end_city):
+        if city not in graph.ids:
+            raise(Exception("Error: unknown city " + city))
+    start, end = graph.ids[start_city], graph.ids[end_city]
+    end_coordinates = (graph.latitudes[end], graph.longitudes[end])
+    # Which of (path length, distance, time, delivery time) the cost function accumulates
+    g_index = ('segments', 'distance', 'time', 'delivery').index(cost_function)
+
+    # Best known cost to each node and the node and segment it was reached by, instead of a path per fringe entry,
+    # plus the totals the cost functions carry forward: (distance, time, delivery time, nodes on the path)
+    best_g = {start: 0}
+    parents = {start: None}
+    totals = {start: (0, 0, 0, 1)}
+    # Nodes expanded with their current best cost. The heuristic runs on estimated coordinates for the
+    # junctions and is not consistent, so a cheaper way to an expanded node can still turn up: the node
+    # is then reopened and pushed again, and the entries it leaves behind are skipped when popped.
+    closed = set()
+    fringe = [(0, start, 0)]
+    nodes_expanded = 0
+    nodes_reopened = 0
+    while fringe:
+        cost, node, g = heapq.heappop(fringe)
+        if g > best_g[node]:
+            # Left behind when the node was pushed again with a lower cost
+            continue
+        if node == end:
+            if stats is not None:
+                stats['nodes_expanded'] = nodes_expanded
+                stats['nodes_reopened'] = nodes_reopened
+            t_distance, t_time, t_d_time, routes = getInformation(trace_path(parents, end), graph)
             return t_distance, t_time, t_d_time, routes
-        already_visited.append(city)
-        option_cities_list = find_paths(cost_function, cost, total_distance, total_time, total_delivery_time, city, path, (latitude, longitude), end_city, segment_dataset, coordinate_dataset, max_speed, avg_distance)  # returns list of potential cities with cost, city, path
-        for op_city in option_cities_list:
-            latitude = op_city[3]
-            longitude = op_city[4]
-            total_distance = op_city[5]
-            total_time = op_city[6]
-            total_delivery_time = op_city[7]
-            if op_city[1] not in already_visited:
-                pQueue.put((op_city[0], (op_city[1], op_city[2], (latitude,longitude), total_distance, total_time, total_delivery_time)))
+        closed.add(node)
+        nodes_expanded += 1
+        total_distance, total_time, total_delivery_time, path_length = totals[node]
+        option_cities_list = find_paths(cost_function, cost, total_distance, total_time, total_delivery_time, node, path_length, end_coordinates, graph)  # returns list of potential cities with cost and totals
+        for next_cost, next_node, segment, next_distance, next_time, next_delivery_time in option_cities_list:
+            next_g = (path_length, next_distance, next_time, next_delivery_time)[g_index]
+            if next_g >= best_g.get(next_node, math.inf):
+                continue
+            if next_node in closed:
+                closed.discard(next_node)
+                nodes_reopened += 1
+            best_g[next_node] = next_g
+            parents[next_node] = (node, segment)
+            totals[next_node] = (next_distance, next_time, next_delivery_time, path_length+1)
+            heapq.heappush(fringe, (next_cost, next_node, next_g))
+    raise(Exception("Error: no route from " + start_city + " to " + end_city))
+
+
+def find_route(start, end, cost, graph=None, stats=None):
+    '''
+    The find_route function does the work of get_route, on a graph that is already loaded when one is given.
+    route_server.py calls it with the graph it keeps in memory.
+
+    ARGS    : start[STRING], end[STRING], cost[STRING], graph[RoadGraph], stats[DICT] as for get_optimal_route
+    RETURNS : route[DICT] as described in get_route
+    '''
+    total_miles, total_hours, total_delivery_hours, route_taken = get_optimal_route(start, end, cost, graph, stats)
+    
+    return {"total-segments": len(route_taken),
+            "total-miles": float(total_miles),
+            "total-hours": float(total_hours),
+            "total-delivery-hours": float(total_delivery_hours),
+            "route-taken": route_taken}
+
 
 def get_route(start, end, cost):
     """
@@ -268,13 +534,7 @@ def get_route(start, end, cost):
     5. The current code just returns a dummy solution.
     """
 
-    total_miles, total_hours, total_delivery_hours, route_taken = get_optimal_route(start, end, cost)
-    
-    return {"total-segments": len(route_taken),
-            "total-miles": float(total_miles),
-            "total-hours": float(total_hours),
-            "total-delivery-hours": float(total_delivery_hours),
-            "route-taken": route_taken}
+    return find_route(start, end, cost)
 
 
 # Please don't modify anything below this line
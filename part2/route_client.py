@@ -0,0 +1,60 @@
+#!/usr/local/bin/python3
+# route_client.py : Find a route with a running route_server.py
+#
+# Code by: Aashay Gondalia (aagond), Harsh K Atha (hatha)
+#
+# Usage: ./route_client.py start_city end_city cost_function [--socket PATH]
+#
+# Prints the same output as route.py. Only the standard library is imported, so the
+# client starts in milliseconds and the server does the rest.
+
+import os
+import json
+import socket
+import argparse
+import tempfile
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "route.sock")
+COST_FUNCTIONS = ["segments", "distance", "time", "delivery"]
+
+
+def request_route(start_city, end_city, cost_function, path=DEFAULT_SOCKET):
+    '''
+    Send one query to the server and wait for its result.
+
+    ARGS    : start_city[STRING], end_city[STRING], cost_function[STRING], path[STRING]
+    RETURNS : result[DICT]
+    '''
+    request = {"id": 0, "start": start_city, "end": end_city, "cost": cost_function}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        connection.sendall((json.dumps(request) + "\n").encode())
+        with connection.makefile("rb") as replies:
+            reply = replies.readline()
+    if not reply:
+        raise(Exception("Error: server closed the connection"))
+    return json.loads(reply)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find a route with a running route_server.py")
+    parser.add_argument("start_city")
+    parser.add_argument("end_city")
+    parser.add_argument("cost_function", choices=COST_FUNCTIONS)
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket path")
+    args = parser.parse_args()
+
+    result = request_route(args.start_city, args.end_city, args.cost_function, args.socket)
+    if result["status"] != "solved":
+        raise(Exception("Error: " + result["status"].replace("error: ", "", 1)))
+    result = result["route"]
+
+    # Pretty print the route
+    print("Start in %s" % args.start_city)
+    for step in result["route-taken"]:
+        print("   Then go to %s via %s" % tuple(step))
+
+    print("\n          Total segments: %4d" % result["total-segments"])
+    print("             Total miles: %8.3f" % result["total-miles"])
+    print("             Total hours: %8.3f" % result["total-hours"])
+    print("Total hours for delivery: %8.3f" % result["total-delivery-hours"])
@@ -0,0 +1,164 @@
+#!/usr/local/bin/python3
+# route_server.py : Long-running route finder behind a Unix domain socket
+#
+# Code by: Aashay Gondalia (aagond), Harsh K Atha (hatha)
+#
+# Usage: ./route_server.py [--socket PATH] [--workers N] [--data DIR]
+#
+# The road graph is compiled (if needed) once when the server starts, and every worker
+# keeps it mapped, so a query only pays for its search. Clients send one JSON object per
+# line, {"id": ..., "start": city, "end": city, "cost": cost_function}, and get one JSON
+# line back per request, in the order they finish: {"id": ..., "status": "solved",
+# "route": {the dictionary get_route returns}, "nodes_expanded": N, "wall_time": S,
+# "latency": S}, or a status naming the error. wall_time is the search itself, latency
+# runs from reading the request to sending the answer, time spent queued included.
+# Restart the server after changing the datasets.
+#
+# route_client.py sends one query to the server and prints it the same way route.py does.
+
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import route
+import route_client
+
+# The graph each worker searches, mapped once when the worker starts
+_graph = None
+
+
+def _init_worker(directory):
+    global _graph
+    _graph = route.load_graph(directory)
+
+
+def fork_context():
+    '''The multiprocessing context for the workers: fork where the platform has it, so they start without reimporting'''
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def error_status(error):
+    '''The status reported for a failed request: "error: " and what went wrong'''
+    # route.py raises its errors as "Error: ...", which would read "error: Error: ..."
+    return "error: " + (str(error).replace("Error: ", "", 1) or type(error).__name__)
+
+
+def route_request(start_city, end_city, cost_function):
+    '''
+    Worker entry point: find one route on the worker's graph.
+
+    ARGS    : start_city[STRING], end_city[STRING], cost_function[STRING]
+    RETURNS : result[DICT]
+    '''
+    start = time.monotonic()
+    stats = {}
+    try:
+        result = {"status": "solved", "route": route.find_route(start_city, end_city, cost_function, _graph, stats)}
+    except Exception as error:
+        result = {"status": error_status(error), "route": None}
+    result["nodes_expanded"] = stats.get("nodes_expanded")
+    result["wall_time"] = time.monotonic() - start
+    return result
+
+
+def parse_request(line):
+    '''
+    Check one request line.
+
+    ARGS    : line[BYTES]
+    RETURNS : request[DICT]
+    '''
+    request = json.loads(line)
+    if not isinstance(request, dict):
+        raise ValueError("expected a JSON object")
+    for field in ("start", "end"):
+        if not isinstance(request.get(field), str):
+            raise ValueError(field + " must be a city name")
+    if request.get("cost") not in route_client.COST_FUNCTIONS:
+        raise ValueError("unknown cost function " + str(request.get("cost")))
+    return request
+
+
+def request_id(line):
+    '''The id of a request that failed to parse, when it is at least a JSON object'''
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return None
+    return {"id": request.get("id")} if isinstance(request, dict) else None
+
+
+class RouteServer:
+    '''Accepts client connections and hands their queries to the worker pool'''
+    def __init__(self, workers=None, directory='.'):
+        # Compile the graph file here, so the workers only map it
+        route.load_graph(directory)
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=fork_context(),
+                                            initializer=_init_worker, initargs=(directory,))
+
+    async def respond(self, line, writer, received):
+        request = None
+        try:
+            request = parse_request(line)
+            result = await asyncio.get_running_loop().run_in_executor(
+                self.executor, route_request, request["start"], request["end"], request["cost"])
+        except Exception as error:
+            # Every request gets an answer, even when it or its worker fails
+            result = {"status": error_status(error), "route": None}
+            if request is None:
+                request = request_id(line)
+        if request is not None:
+            result["id"] = request.get("id")
+        result["latency"] = time.monotonic() - received
+        if writer.is_closing():
+            return
+        try:
+            writer.write((json.dumps(result) + "\n").encode())
+            await writer.drain()
+        except ConnectionError:
+            # The client is gone, there is nobody left to answer
+            pass
+
+    async def serve_client(self, reader, writer):
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.ensure_future(self.respond(line, writer, time.monotonic()))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def serve(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(self.serve_client, path)
+        print("Serving on " + path)
+        sys.stdout.flush()
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find routes sent over a Unix socket, see route_client.py")
+    parser.add_argument("--socket", default=route_client.DEFAULT_SOCKET, help="Unix socket path")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--data", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="directory holding road-segments.txt and city-gps.txt")
+    args = parser.parse_args()
+
+    asyncio.run(RouteServer(args.workers, args.data).serve(args.socket))
@@ -0,0 +1,143 @@
+# !/usr/bin/env python3
+# test_route.py : Checks for the compiled road graph file and the route search
+#
+# Code by: Aashay Gondalia (aagond), Harsh K Atha (hatha)
+#
+# The graph file tests work on a copy of the datasets in a temporary directory, so the graph file
+# next to route.py is not touched. The search tests run on small hand-built graphs.
+
+import os
+import shutil
+from array import array
+import route
+import pytest
+
+
+@pytest.fixture
+def datasets(tmp_path):
+    for name in route.SOURCE_FILES:
+        shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), str(tmp_path))
+    return str(tmp_path)
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    '''Counts the times the graph is built from the datasets'''
+    calls = []
+    build_graph = route.build_graph
+
+    def counting_build_graph(*args):
+        calls.append(args)
+        return build_graph(*args)
+    monkeypatch.setattr(route, "build_graph", counting_build_graph)
+    return calls
+
+
+def graph_path(directory):
+    return os.path.join(directory, route.GRAPH_FILE)
+
+
+@pytest.mark.timeout(300)
+def test_graph_file_is_reused(datasets, builds):
+    graph = route.load_graph(datasets)
+    assert len(builds) == 1 and os.path.exists(graph_path(datasets))
+    mapped = route.load_graph(datasets)
+    assert len(builds) == 1
+    assert mapped.names == graph.names and list(mapped.targets) == list(graph.targets)
+
+
+@pytest.mark.timeout(300)
+def test_touched_dataset_rewrites_stamp(datasets, builds):
+    route.load_graph(datasets)
+    path = os.path.join(datasets, 'road-segments.txt')
+    status = os.stat(path)
+    os.utime(path, ns=(status.st_atime_ns, status.st_mtime_ns + 10**9))
+
+    route.load_graph(datasets)
+    assert len(builds) == 1
+    _, stamp = route.read_graph_file(graph_path(datasets))
+    assert stamp == route.source_stamp(datasets)
+
+
+@pytest.mark.timeout(300)
+def test_edited_dataset_rebuilds(datasets, builds):
+    route.load_graph(datasets)
+    with open(os.path.join(datasets, 'road-segments.txt'), 'a') as file:
+        file.write('Nowhere,_Indiana Bloomington,_Indiana 10 45 IN_999\n')
+
+    graph = route.load_graph(datasets)
+    assert len(builds) == 2
+    assert 'Nowhere,_Indiana' in graph.ids
+    assert 'Nowhere,_Indiana' in route.read_graph_file(graph_path(datasets))[0].ids
+
+
+@pytest.mark.timeout(300)
+@pytest.mark.parametrize("damage", ["truncated", "bad magic"])
+def test_damaged_graph_file_rebuilds(datasets, builds, damage):
+    graph = route.load_graph(datasets)
+    path = graph_path(datasets)
+    if damage == "truncated":
+        with open(path, 'r+b') as file:
+            file.truncate(os.path.getsize(path) - 100)
+    else:
+        with open(path, 'r+b') as file:
+            file.write(b'NOTAGRPH')
+    with pytest.raises(ValueError):
+        route.read_graph_file(path)
+
+    assert route.load_graph(datasets).names == graph.names
+    assert len(builds) == 2
+    assert route.read_graph_file(path)[0].names == graph.names
+
+
+def make_graph(coordinates, road_segments):
+    '''
+    A RoadGraph laid out the way build_graph lays one out, with every segment listed under both ends in order.
+
+    ARGS    : coordinates[DICT] of city to (latitude, longitude), road_segments[LIST] of (start, end, distance, speed, highway)
+    RETURNS : graph[RoadGraph]
+    '''
+    names = list(coordinates)
+    ids = {name: node for node, name in enumerate(names)}
+    highway_names = list(dict.fromkeys(highway for _, _, _, _, highway in road_segments))
+    edges = [[] for _ in names]
+    for start, end, distance, speed, highway in road_segments:
+        edges[ids[start]].append((ids[end], distance, speed, highway_names.index(highway)))
+        edges[ids[end]].append((ids[start], distance, speed, highway_names.index(highway)))
+    offsets, targets, highways = array('i', [0]), array('i'), array('i')
+    distances, speeds = array('d'), array('d')
+    for node_edges in edges:
+        for next_node, distance, speed, highway in node_edges:
+            targets.append(next_node)
+            distances.append(distance)
+            speeds.append(speed)
+            highways.append(highway)
+        offsets.append(len(targets))
+    latitudes = array('d', [coordinates[name][0] for name in names])
+    longitudes = array('d', [coordinates[name][1] for name in names])
+    max_speed = max(speed for _, _, _, speed, _ in road_segments)
+    avg_distance = max(distance for _, _, distance, _, _ in road_segments)
+    return route.RoadGraph(names, ids, offsets, targets, distances, speeds, highways, highway_names,
+                           latitudes, longitudes, float(max_speed), float(avg_distance))
+
+
+def test_parallel_segments_report_the_one_taken():
+    # The slow road is listed first, the search takes the fast one
+    graph = make_graph({"A": (0.0, 0.0), "B": (0.0, 0.1)},
+                       [("A", "B", 10, 30, "Slow_Road"), ("A", "B", 10, 60, "Fast_Road")])
+    distance, time, _, routes = route.get_optimal_route("A", "B", "time", graph)
+    assert routes == [("B", "Fast_Road for 10 miles")]
+    assert distance == 10 and time == pytest.approx(10/60)
+
+
+def test_cheaper_way_reopens_an_expanded_node():
+    # B's coordinates put it some 69 miles from G although it is a mile from S, so C is first expanded from A
+    # and the cheaper way through B only turns up afterwards
+    graph = make_graph({"S": (0.0, 0.0), "A": (0.0, 0.0), "B": (1.0, 0.0), "C": (0.0, 0.0), "G": (0.0, 0.0)},
+                       [("S", "A", 10, 50, "Road_A"), ("A", "C", 10, 50, "Road_A"),
+                        ("S", "B", 1, 50, "Road_B"), ("B", "C", 1, 50, "Road_B"), ("C", "G", 100, 50, "Road_G")])
+    stats = {}
+    distance, _, _, routes = route.get_optimal_route("S", "G", "distance", graph, stats)
+    assert [city for city, _ in routes] == ["B", "C", "G"]
+    assert distance == 102
+    assert stats["nodes_reopened"] == 1